@@ -0,0 +1,63 @@
+import click
+from flask import current_app
+from app.services.recommendations import build_item_neighbors
+from app.services.trends import backfill_rollups
+from app.services.deletion_jobs import retry_failed_jobs, run_pending_jobs
+from app.services.events import enable_pre_images
+from app.services.indexes import ensure_indexes, verify_query_plans
+from app.services.rating_stats import rebuild_rating_stats
+
+def register_commands(app):
+    """Attach maintenance commands to the Flask CLI"""
+    
+    @app.cli.command("ensure-indexes")
+    def ensure_indexes_command():
+        """Create all declared MongoDB indexes"""
+        for collection_name, index_names in ensure_indexes(current_app.mongo.db).items():
+            print(f"{collection_name}: {', '.join(index_names)}")
+    
+    @app.cli.command("verify-query-plans")
+    def verify_query_plans_command():
+        """Fail if any route's query shape would run as a collection scan"""
+        failures = verify_query_plans(current_app.mongo.db)
+        for name in failures:
+            print(f"COLLSCAN: {name}")
+        if failures:
+            raise SystemExit(1)
+        print("All query shapes use an index")
+    
+    @app.cli.command("rebuild-rating-stats")
+    def rebuild_rating_stats_command():
+        """Recompute per-item rating aggregates from the ratings collection"""
+        total_items = rebuild_rating_stats(current_app.mongo.db)
+        print(f"Rebuilt rating stats for {total_items} items")
+    
+    @app.cli.command("backfill-rating-rollups")
+    def backfill_rating_rollups_command():
+        """Rebuild hourly and daily trend buckets from the ratings collection"""
+        total_buckets = backfill_rollups(current_app.mongo.db)
+        print(f"Rebuilt {total_buckets} rating rollup buckets")
+    
+    @app.cli.command("build-recommendations")
+    @click.option("--top-n", default=app.config["RECOMMENDATIONS_TOP_N"], help="Neighbors stored per item")
+    @click.option("--block-size", default=1000, help="Item rows multiplied per block (bounds memory)")
+    def build_recommendations_command(top_n, block_size):
+        """Precompute item-to-item similarities from all ratings"""
+        total_items = build_item_neighbors(current_app.mongo.db, top_n=top_n, block_size=block_size)
+        print(f"Built neighbor lists for {total_items} items")
+    
+    @app.cli.command("run-deletion-jobs")
+    @click.option("--batch-size", default=500, help="Documents removed per batch")
+    @click.option("--retry-failed", is_flag=True, help="Also rerun jobs that exhausted their retries")
+    def run_deletion_jobs_command(batch_size, retry_failed):
+        """Run pending user deletion jobs, resuming any interrupted ones"""
+        if retry_failed:
+            print(f"Requeued {retry_failed_jobs(current_app.mongo.db)} failed deletion jobs")
+        total_jobs = run_pending_jobs(current_app.mongo.db, batch_size=batch_size)
+        print(f"Ran {total_jobs} deletion jobs")
+    
+    @app.cli.command("enable-event-pre-images")
+    def enable_event_pre_images_command():
+        """Store pre-images on ratings and comments so the event feed can report deletes"""
+        collections = enable_pre_images(current_app.mongo.db)
+        print(f"Enabled pre-images on {', '.join(collections)}; set EVENTS_PRE_IMAGES=true")
\ No newline at end of file
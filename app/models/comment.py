@@ -1,7 +1,24 @@
 from datetime import datetime
 from bson import ObjectId
 
+MAX_CONTENT_LENGTH = 1000
+
+def validate_content(content):
+    """Return an error message for invalid comment content, or None"""
+    if not content:
+        return "Content cannot be empty"
+    if len(content) > MAX_CONTENT_LENGTH:
+        return "Content must be less than 1000 characters"
+    return None
+
+def validate_comment_fields(content):
+    """Validate comment fields without building a Comment"""
+    error_message = validate_content(content)
+    return error_message is None, error_message
+
 class Comment:
+    __slots__ = ("_id", "user_id", "item_id", "content", "created_at")
+    
     def __init__(self, user_id, item_id, content):
         self._id = ObjectId()
         self.user_id = ObjectId(user_id)  # Convert string ID to ObjectId
@@ -21,22 +38,16 @@ class Comment:
     
     @staticmethod
     def from_dict(data):
-        """Create comment object from dictionary (from MongoDB)"""
-        comment = Comment(
-            user_id=str(data.get('user_id')),
-            item_id=data.get('item_id'),
-            content=data.get('content')
-        )
-        comment._id = data.get('_id', ObjectId())
-        comment.created_at = data.get('created_at', datetime.utcnow())
+        """Create comment object from dictionary (from MongoDB) without generating new ids"""
+        comment = Comment.__new__(Comment)
+        comment._id = data.get('_id') or ObjectId()
+        comment.user_id = data.get('user_id')
+        comment.item_id = data.get('item_id')
+        comment.content = data.get('content')
+        comment.created_at = data.get('created_at') or datetime.utcnow()
         return comment
     
     def validate(self):
         """Validate comment data"""
-        if not self.content:
-            return False, "Content cannot be empty"
-            
-        if len(self.content) > 1000:
-            return False, "Content must be less than 1000 characters"
-            
-        return True, None
\ No newline at end of file
+        error_message = validate_content(self.content)
+        return error_message is None, error_message
\ No newline at end of file
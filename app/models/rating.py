@@ -1,7 +1,37 @@
 from datetime import datetime
 from bson import ObjectId
 
+MAX_DESCRIPTION_LENGTH = 500
+
+def validate_rating_value(value):
+    """Return an error message for an invalid rating value, or None"""
+    if not isinstance(value, (int, float)):
+        return "Rating must be a number"
+    if value < 1 or value > 5:
+        return "Rating must be between 1 and 5"
+    return None
+
+def validate_description(description):
+    """Return an error message for an invalid description, or None"""
+    if description and len(description) > MAX_DESCRIPTION_LENGTH:
+        return "Description must be less than 500 characters"
+    return None
+
+def validate_rating_fields(rating, description=None):
+    """Validate rating fields without building a Rating"""
+    error_message = validate_rating_value(rating) or validate_description(description)
+    return error_message is None, error_message
+
+def validate_ratings(rows):
+    """Validate a list of rating dicts; returns an error message or None per row"""
+    return [
+        validate_rating_value(row.get('rating')) or validate_description(row.get('description'))
+        for row in rows
+    ]
+
 class Rating:
+    __slots__ = ("_id", "user_id", "item_id", "rating", "description", "created_at")
+    
     def __init__(self, user_id, item_id, rating, description=None):
         self._id = ObjectId()
         self.user_id = ObjectId(user_id)  # Convert string ID to ObjectId
@@ -23,26 +53,17 @@ class Rating:
     
     @staticmethod
     def from_dict(data):
-        """Create rating object from dictionary (from MongoDB)"""
-        rating = Rating(
-            user_id=str(data.get('user_id')),
-            item_id=data.get('item_id'),
-            rating=data.get('rating'),
-            description=data.get('description')
-        )
-        rating._id = data.get('_id', ObjectId())
-        rating.created_at = data.get('created_at', datetime.utcnow())
+        """Create rating object from dictionary (from MongoDB) without generating new ids"""
+        rating = Rating.__new__(Rating)
+        rating._id = data.get('_id') or ObjectId()
+        rating.user_id = data.get('user_id')
+        rating.item_id = data.get('item_id')
+        rating.rating = data.get('rating')
+        rating.description = data.get('description')
+        rating.created_at = data.get('created_at') or datetime.utcnow()
         return rating
     
     def validate(self):
         """Validate rating data"""
-        if not isinstance(self.rating, (int, float)):
-            return False, "Rating must be a number"
-            
-        if self.rating < 1 or self.rating > 5:
-            return False, "Rating must be between 1 and 5"
-            
-        if self.description and len(self.description) > 500:
-            return False, "Description must be less than 500 characters"
-            
-        return True, None
\ No newline at end of file
+        error_message = validate_rating_value(self.rating) or validate_description(self.description)
+        return error_message is None, error_message
\ No newline at end of file
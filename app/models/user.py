@@ -2,11 +2,28 @@ from datetime import datetime
 from bson import ObjectId
 from werkzeug.security import generate_password_hash, check_password_hash
 
+MIN_PASSWORD_LENGTH = 6
+
+def validate_email(email):
+    """Return an error message for an invalid email, or None"""
+    if not isinstance(email, str) or '@' not in email:
+        return "Invalid email format"
+    return None
+
+def validate_password(password):
+    """Return an error message for a password that is too weak, or None"""
+    if not isinstance(password, str) or len(password) < MIN_PASSWORD_LENGTH:
+        return "Password must be at least 6 characters"
+    return None
+
 class User:
-    def __init__(self, email, password, name=None):
+    __slots__ = ("_id", "email", "password", "name", "created_at")
+    
+    def __init__(self, email, password=None, name=None, password_hash=None):
         self._id = ObjectId()
         self.email = email
-        self.password = generate_password_hash(password)
+        # Callers that hash off the request thread pass password_hash instead
+        self.password = password_hash or generate_password_hash(password)
         self.name = name
         self.created_at = datetime.utcnow()
     
@@ -26,13 +43,11 @@ class User:
     
     @staticmethod
     def from_dict(data):
-        """Create user object from dictionary (from MongoDB)"""
-        user = User(
-            email=data.get('email'),
-            password="temp",
-            name=data.get('name')
-        )
-        user._id = data.get('_id', ObjectId())
+        """Create user object from dictionary (from MongoDB) without hashing anything"""
+        user = User.__new__(User)
+        user._id = data.get('_id') or ObjectId()
+        user.email = data.get('email')
         user.password = data.get('password')
-        user.created_at = data.get('created_at', datetime.utcnow())
+        user.name = data.get('name')
+        user.created_at = data.get('created_at') or datetime.utcnow()
         return user
\ No newline at end of file
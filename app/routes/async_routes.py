@@ -0,0 +1,223 @@
+from functools import wraps
+from quart import Blueprint, Response, request, jsonify, current_app
+from bson import ObjectId
+from app.services.pagination import paginate_async
+from app.services.projection import expand_users_async, parse_expand, parse_fields, strip_fields, with_required
+from app.services.rating_stats import format_stats
+from app.services.response_cache import get_backend, listing_key, split_entry, store_entry
+from app.services.serialization import MIMETYPES, encode, response_format
+
+async_routes = Blueprint('async_routes', __name__)
+
+# Flask endpoints that the ASGI entry point serves with Motor; every other
+# route is forwarded to the WSGI application
+ASYNC_ENDPOINTS = {
+    'rating_routes.get_ratings',
+    'rating_routes.get_rating',
+    'rating_routes.get_item_stats',
+    'comment_routes.get_comments',
+    'comment_routes.get_comment',
+    'user_routes.get_all_users',
+    'user_routes.get_user'
+}
+
+def render(payload, status=200):
+    """Quart counterpart of serialization.render, so both entry points send identical bodies"""
+    response_type = response_format(request.accept_mimetypes)
+    response = Response(encode(payload, response_type), status=status, mimetype=MIMETYPES[response_type])
+    response.vary.add("Accept")
+    return response
+
+def cached_listing(collection):
+    """Quart counterpart of response_cache.cached_listing, sharing its entries and versions"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            backend = get_backend(current_app.config)
+            if backend is None:
+                return await view(*args, **kwargs)
+            
+            response_type = response_format(request.accept_mimetypes)
+            key = listing_key(backend, collection, request.args, response_type)
+            
+            # Cached bodies are replayed as-is, or answered with 304
+            cached = backend.get(key)
+            if cached is not None:
+                etag, body = split_entry(cached)
+                response = Response(body, mimetype=MIMETYPES[response_type])
+                response.vary.add("Accept")
+                response.set_etag(etag)
+                return await response.make_conditional(request)
+            
+            response = await current_app.make_response(await view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            
+            response.set_etag(store_entry(backend, key, await response.get_data()))
+            return await response.make_conditional(request)
+        return wrapper
+    return decorator
+
+def _listing_query(args):
+    """Build a listing filter from user_id and item_id query params"""
+    query = {}
+    if args.get('user_id'):
+        try:
+            query['user_id'] = ObjectId(args['user_id'])
+        except Exception:
+            raise ValueError("Invalid user_id format")
+    if args.get('item_id'):
+        query['item_id'] = args['item_id']
+    return query
+
+def _sparse_args(args, collection):
+    """Parse fields= and expand= into (projection, internal fields, expand)"""
+    expand = parse_expand(args)
+    projection, internal = with_required(
+        parse_fields(args, collection),
+        ['user_id'] if 'user' in expand else []
+    )
+    return projection, internal, expand
+
+async def _finish_docs(db, docs, internal, expand):
+    """Apply expand=user and drop internal fields; ids and dates are encoded by render"""
+    if 'user' in expand:
+        await expand_users_async(db, docs)
+    strip_fields(docs, internal)
+
+@async_routes.route('/api/ratings', methods=['GET'])
+@cached_listing('ratings')
+async def get_ratings():
+    try:
+        db = current_app.motor
+        query = _listing_query(request.args)
+        projection, internal, expand = _sparse_args(request.args, 'ratings')
+        
+        async def estimate(q):
+            if set(q) != {"item_id"}:
+                return None
+            stats = await db.rating_stats.find_one({"_id": q['item_id']}, {"count": 1})
+            return stats.get('count', 0) if stats else 0
+        
+        # Page fetch and count run concurrently
+        ratings, pagination = await paginate_async(
+            db.ratings, query, request.args, estimate=estimate, projection=projection
+        )
+        await _finish_docs(db, ratings, internal, expand)
+        
+        return render({
+            "ratings": ratings,
+            **pagination
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_routes.route('/api/ratings/<rating_id>', methods=['GET'])
+async def get_rating(rating_id):
+    try:
+        db = current_app.motor
+        projection, internal, expand = _sparse_args(request.args, 'ratings')
+        rating_data = await db.ratings.find_one({"_id": ObjectId(rating_id)}, projection)
+        
+        if not rating_data:
+            return jsonify({"error": "Rating not found"}), 404
+        
+        await _finish_docs(db, [rating_data], internal, expand)
+        
+        return render(rating_data)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_routes.route('/api/items/<item_id>/stats', methods=['GET'])
+async def get_item_stats(item_id):
+    try:
+        db = current_app.motor
+        stats = await db.rating_stats.find_one({"_id": item_id})
+        
+        return jsonify(format_stats(item_id, stats)), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_routes.route('/api/comments', methods=['GET'])
+@cached_listing('comments')
+async def get_comments():
+    try:
+        db = current_app.motor
+        query = _listing_query(request.args)
+        projection, internal, expand = _sparse_args(request.args, 'comments')
+        
+        # Page fetch and count run concurrently
+        comments, pagination = await paginate_async(db.comments, query, request.args, projection=projection)
+        await _finish_docs(db, comments, internal, expand)
+        
+        return render({
+            "comments": comments,
+            **pagination
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_routes.route('/api/comments/<comment_id>', methods=['GET'])
+async def get_comment(comment_id):
+    try:
+        db = current_app.motor
+        projection, internal, expand = _sparse_args(request.args, 'comments')
+        comment_data = await db.comments.find_one({"_id": ObjectId(comment_id)}, projection)
+        
+        if not comment_data:
+            return jsonify({"error": "Comment not found"}), 404
+        
+        await _finish_docs(db, [comment_data], internal, expand)
+        
+        return render(comment_data)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_routes.route('/api/users', methods=['GET'])
+async def get_all_users():
+    try:
+        db = current_app.motor
+        
+        # Page fetch and count run concurrently
+        users, pagination = await paginate_async(
+            db.users, {}, request.args, projection=parse_fields(request.args, 'users')
+        )
+        
+        return render({
+            "users": users,
+            **pagination
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_routes.route('/api/users/<user_id>', methods=['GET'])
+async def get_user(user_id):
+    try:
+        db = current_app.motor
+        user_data = await db.users.find_one({"_id": ObjectId(user_id)}, parse_fields(request.args, 'users'))
+        
+        if not user_data:
+            return jsonify({"error": "User not found"}), 404
+        
+        return render(user_data)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -1,7 +1,14 @@
 from flask import Blueprint, request, jsonify, current_app
-from app.models.comment import Comment
+from app.models.comment import Comment, validate_comment_fields
+from app.services.pagination import paginate
+from app.services.serialization import render
+from app.services.projection import expand_users, parse_expand, parse_fields, strip_fields, with_required
+from app.services.cache import user_exists
+from app.services.response_cache import cached_listing, invalidate_listing
+from app.services.export import EXPORT_FIELDS, build_export_query, export_response
+from app.services.search import SearchUnavailable, search
+from app.services.write_behind import WriteBehindFull
 from bson import ObjectId
-import jwt
 from datetime import datetime
 
 comment_routes = Blueprint('comment_routes', __name__)
@@ -23,8 +30,7 @@ def create_comment():
             
         # Check if user exists
         mongo = current_app.mongo
-        user = mongo.db.users.find_one({"_id": user_id})
-        if not user:
+        if not user_exists(mongo.db, user_id):
             return jsonify({"error": "User not found"}), 404
         
         # Create new comment object
@@ -39,18 +45,30 @@ def create_comment():
         if not is_valid:
             return jsonify({"error": error_message}), 400
         
+        # Queue for group commit when write-behind is enabled
+        if current_app.write_behind:
+            current_app.write_behind.submit('comments', new_comment.to_dict())
+            return jsonify({
+                "message": "Comment accepted",
+                "comment_id": str(new_comment._id)
+            }), 202
+        
         # Insert comment
         result = mongo.db.comments.insert_one(new_comment.to_dict())
+        invalidate_listing('comments', [new_comment.item_id])
         
         return jsonify({
             "message": "Comment created successfully",
             "comment_id": str(result.inserted_id)
         }), 201
         
+    except WriteBehindFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @comment_routes.route('/api/comments', methods=['GET'])
+@cached_listing('comments')
 def get_comments():
     try:
         mongo = current_app.mongo
@@ -69,30 +87,73 @@ def get_comments():
         if item_id:
             query['item_id'] = item_id
             
-        # Get pagination parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-        skip = (page - 1) * per_page
-        
-        # Get total count
-        total_comments = mongo.db.comments.count_documents(query)
+        # Sparse fields; user_id is fetched for expand=user even when not selected
+        expand = parse_expand(request.args)
+        projection, internal = with_required(
+            parse_fields(request.args, 'comments'),
+            ['user_id'] if 'user' in expand else []
+        )
         
         # Get comments with pagination
-        comments = list(mongo.db.comments.find(query).skip(skip).limit(per_page))
+        comments, pagination = paginate(mongo.db.comments, query, request.args, projection=projection)
         
-        # Process comments for response
-        for comment in comments:
-            comment['_id'] = str(comment['_id'])
-            comment['user_id'] = str(comment['user_id'])
+        # Join author names with one lookup for the whole page
+        if 'user' in expand:
+            expand_users(mongo.db, comments)
+        strip_fields(comments, internal)
         
-        return jsonify({
+        # ObjectIds and dates are encoded by the serializer
+        return render({
             "comments": comments,
-            "page": page,
-            "per_page": per_page,
-            "total": total_comments,
-            "total_pages": (total_comments + per_page - 1) // per_page
-        }), 200
+            **pagination
+        })
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@comment_routes.route('/api/comments/export', methods=['GET'])
+def export_comments():
+    try:
+        mongo = current_app.mongo
+        query = build_export_query(request.args)
+        export_format = request.args.get('format', 'ndjson')
+        return export_response(mongo.db.comments, EXPORT_FIELDS['comments'], query, export_format)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@comment_routes.route('/api/comments/search', methods=['GET'])
+def search_comments():
+    try:
+        mongo = current_app.mongo
+        
+        # Build optional filters
+        query = {}
+        if request.args.get('item_id'):
+            query['item_id'] = request.args['item_id']
+        if request.args.get('user_id'):
+            try:
+                query['user_id'] = ObjectId(request.args['user_id'])
+            except:
+                return jsonify({"error": "Invalid user_id format"}), 400
+        
+        # Ranked by text relevance using the content text index
+        comments, pagination = search(mongo.db.comments, request.args.get('q'), query, request.args)
+        
+        # ObjectIds and dates are encoded by the serializer
+        return render({
+            "comments": comments,
+            **pagination
+        })
+        
+    except SearchUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -101,17 +162,24 @@ def get_comment(comment_id):
     try:
         mongo = current_app.mongo
         object_id = ObjectId(comment_id)
-        comment_data = mongo.db.comments.find_one({"_id": object_id})
+        expand = parse_expand(request.args)
+        projection, internal = with_required(
+            parse_fields(request.args, 'comments'),
+            ['user_id'] if 'user' in expand else []
+        )
+        comment_data = mongo.db.comments.find_one({"_id": object_id}, projection)
         
         if not comment_data:
             return jsonify({"error": "Comment not found"}), 404
-            
-        # Convert ObjectId to string for JSON response
-        comment_data['_id'] = str(comment_data['_id'])
-        comment_data['user_id'] = str(comment_data['user_id'])
         
-        return jsonify(comment_data), 200
+        if 'user' in expand:
+            expand_users(mongo.db, [comment_data])
+        strip_fields([comment_data], internal)
+            
+        return render(comment_data)
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -130,25 +198,20 @@ def update_comment(comment_id):
         if 'content' not in data:
             return jsonify({"error": "Content is required for update"}), 400
             
-        # Create Comment object for validation
-        updated_comment = Comment(
-            user_id=str(existing_comment['user_id']),
-            item_id=existing_comment['item_id'],
-            content=data['content']
-        )
-        
         # Validate updated data
-        is_valid, error_message = updated_comment.validate()
+        is_valid, error_message = validate_comment_fields(data['content'])
         if not is_valid:
             return jsonify({"error": error_message}), 400
             
-        # Perform update
+        # Perform update; unchanged content matches nothing so updated_at is left alone
         result = mongo.db.comments.update_one(
-            {"_id": object_id},
-            {"$set": {"content": data['content']}}
+            {"_id": object_id, "content": {"$ne": data['content']}},
+            {"$set": {"content": data['content'], "updated_at": datetime.utcnow()}}
         )
         
         if result.modified_count > 0:
+            invalidate_listing('comments', [existing_comment['item_id']])
+            
             # Get updated comment data
             updated_data = mongo.db.comments.find_one({"_id": object_id})
             updated_data['_id'] = str(updated_data['_id'])
@@ -178,6 +241,8 @@ def delete_comment(comment_id):
         result = mongo.db.comments.delete_one({"_id": object_id})
         
         if result.deleted_count > 0:
+            invalidate_listing('comments', [existing_comment['item_id']])
+            
             return jsonify({
                 "message": "Comment deleted successfully",
                 "comment_id": comment_id
@@ -1,8 +1,26 @@
-from flask import Blueprint, request, jsonify, current_app
-from app.models.rating import Rating
+from flask import Blueprint, Response, request, jsonify, current_app
+from app.models.rating import Rating, validate_rating_fields
+from app.services.rating_stats import apply_rating_change, columnar, estimate_rating_count, format_stats, summarize_items
+from app.services.pagination import paginate
+from app.services.serialization import render
+from app.services.projection import expand_users, parse_expand, parse_fields, strip_fields, with_required
+from app.services.cache import user_exists
+from app.services.response_cache import cached_listing, invalidate_listing
+from app.services.export import EXPORT_FIELDS, build_export_query, export_response
+from app.services.search import SearchUnavailable, search
+from app.services.bulk_ratings import ingest_ratings
+from app.services.auth import AuthError, get_token_claims
+from app.services.recommendations import similar_items
+from app.services.leaderboard import parse_window, top_items
+from app.services.trends import item_trend
+from app.services.write_behind import WriteBehindFull
+from app.services.events import FeedFull, event_stream
+from app.services.indexes import unique_indexes_ready
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
-import jwt
 from datetime import datetime
+import json
 
 rating_routes = Blueprint('rating_routes', __name__)
 
@@ -23,8 +41,7 @@ def create_rating():
             
         # Check if user exists
         mongo = current_app.mongo
-        user = mongo.db.users.find_one({"_id": user_id})
-        if not user:
+        if not user_exists(mongo.db, user_id):
             return jsonify({"error": "User not found"}), 404
         
         # Create new rating object
@@ -40,26 +57,156 @@ def create_rating():
         if not is_valid:
             return jsonify({"error": error_message}), 400
         
-        # Check if rating already exists for this user and item
-        existing_rating = mongo.db.ratings.find_one({
-            "user_id": user_id,
-            "item_id": data['item_id']
-        })
-        if existing_rating:
+        # Create or replace in a single round trip when requested
+        upsert = request.args.get('upsert', 'false').lower() == 'true' or data.get('upsert') is True
+        if upsert:
+            previous = _upsert_rating(mongo, new_rating)
+            return _upsert_response(previous, new_rating)
+        
+        # Duplicates are rejected by the unique (user_id, item_id) index; check
+        # first only when that index cannot be built
+        if not unique_indexes_ready(mongo.db, 'ratings') and mongo.db.ratings.find_one(
+            {"user_id": user_id, "item_id": new_rating.item_id}, {"_id": 1}
+        ):
+            return jsonify({"error": "Rating already exists for this item"}), 409
+        
+        # Queue for group commit when write-behind is enabled; duplicates are
+        # rejected by the unique index at flush time
+        if current_app.write_behind:
+            current_app.write_behind.submit('ratings', new_rating.to_dict())
+            return jsonify({
+                "message": "Rating accepted",
+                "rating_id": str(new_rating._id)
+            }), 202
+        
+        # Insert rating; the unique index rejects concurrent duplicates
+        try:
+            result = mongo.db.ratings.insert_one(new_rating.to_dict())
+        except DuplicateKeyError:
             return jsonify({"error": "Rating already exists for this item"}), 409
         
-        # Insert rating
-        result = mongo.db.ratings.insert_one(new_rating.to_dict())
+        # Update item aggregates and cached listings
+        apply_rating_change(
+            mongo.db,
+            new_rating.item_id,
+            new_value=new_rating.rating,
+            created_at=new_rating.created_at
+        )
+        invalidate_listing('ratings', [new_rating.item_id])
         
         return jsonify({
             "message": "Rating created successfully",
             "rating_id": str(result.inserted_id)
         }), 201
         
+    except WriteBehindFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _upsert_rating(mongo, rating):
+    """Create or replace a user's rating for an item and return the previous document"""
+    unique_indexes_ready(mongo.db, 'ratings')
+    
+    def write():
+        return mongo.db.ratings.find_one_and_update(
+            {"user_id": rating.user_id, "item_id": rating.item_id},
+            {
+                "$set": {"rating": rating.rating, "description": rating.description, "updated_at": rating.created_at},
+                "$setOnInsert": {"_id": rating._id, "created_at": rating.created_at}
+            },
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    
+    # Two concurrent upserts can both miss and race on the unique index;
+    # the loser retries and then matches the winner's document
+    try:
+        previous = write()
+    except DuplicateKeyError:
+        previous = write()
+    
+    # Adjust item aggregates by the exact delta
+    apply_rating_change(
+        mongo.db,
+        rating.item_id,
+        old_value=previous['rating'] if previous else None,
+        new_value=rating.rating,
+        created_at=previous['created_at'] if previous else rating.created_at
+    )
+    invalidate_listing('ratings', [rating.item_id])
+    return previous
+
+def _upsert_response(previous, rating):
+    """Build the response for an upserted rating"""
+    if previous:
+        return jsonify({
+            "message": "Rating replaced successfully",
+            "rating_id": str(previous['_id']),
+            "previous": {
+                "rating": previous['rating'],
+                "description": previous.get('description')
+            }
+        }), 200
+    
+    return jsonify({
+        "message": "Rating created successfully",
+        "rating_id": str(rating._id),
+        "previous": None
+    }), 201
+
+def _ndjson_rows(stream):
+    """Yield one parsed row per NDJSON line, skipping blank lines"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+@rating_routes.route('/api/ratings/bulk', methods=['POST'])
+def create_ratings_bulk():
+    try:
+        mongo = current_app.mongo
+        
+        # Get batch options
+        ordered = request.args.get('ordered', 'false').lower() == 'true'
+        chunk_size = request.args.get('chunk_size', '1000')
+        if not chunk_size.isdigit() or not 1 <= int(chunk_size) <= 10000:
+            return jsonify({"error": "chunk_size must be between 1 and 10000"}), 400
+        chunk_size = int(chunk_size)
+        
+        # Accept a JSON array or an NDJSON stream
+        if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+            rows = _ndjson_rows(request.stream)
+        else:
+            rows = request.get_json()
+            if not isinstance(rows, list):
+                return jsonify({"error": "Request body must be a JSON array"}), 400
+        
+        # Duplicate rows are reported through the unique index
+        unique_indexes_ready(mongo.db, 'ratings')
+        results = ingest_ratings(mongo.db, rows, ordered=ordered, chunk_size=chunk_size)
+        
+        summary = {"created": 0, "error": 0, "skipped": 0}
+        for result in results:
+            summary[result['status']] += 1
+        
+        return jsonify({
+            "message": "Bulk import finished",
+            "created": summary['created'],
+            "failed": summary['error'],
+            "skipped": summary['skipped'],
+            "results": results
+        }), 200
+        
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @rating_routes.route('/api/ratings', methods=['GET'])
+@cached_listing('ratings')
 def get_ratings():
     try:
         mongo = current_app.mongo
@@ -78,51 +225,107 @@ def get_ratings():
         if item_id:
             query['item_id'] = item_id
             
-        # Get pagination parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-        skip = (page - 1) * per_page
-        
-        # Get total count
-        total_ratings = mongo.db.ratings.count_documents(query)
+        # Sparse fields; user_id is fetched for expand=user even when not selected
+        expand = parse_expand(request.args)
+        projection, internal = with_required(
+            parse_fields(request.args, 'ratings'),
+            ['user_id'] if 'user' in expand else []
+        )
         
         # Get ratings with pagination
-        ratings = list(mongo.db.ratings.find(query).skip(skip).limit(per_page))
+        ratings, pagination = paginate(
+            mongo.db.ratings,
+            query,
+            request.args,
+            estimate=lambda q: estimate_rating_count(mongo.db, q),
+            projection=projection
+        )
         
-        # Process ratings for response - המרה חזרה לstrings
-        for rating in ratings:
-            rating['_id'] = str(rating['_id'])
-            rating['user_id'] = str(rating['user_id'])
+        # Join author names with one lookup for the whole page
+        if 'user' in expand:
+            expand_users(mongo.db, ratings)
+        strip_fields(ratings, internal)
         
-        return jsonify({
+        # ObjectIds and dates are encoded by the serializer
+        return render({
             "ratings": ratings,
-            "page": page,
-            "per_page": per_page,
-            "total": total_ratings,
-            "total_pages": (total_ratings + per_page - 1) // per_page
-        }), 200
+            **pagination
+        })
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
     # Add these routes to rating_routes.py
 
+@rating_routes.route('/api/ratings/export', methods=['GET'])
+def export_ratings():
+    try:
+        mongo = current_app.mongo
+        query = build_export_query(request.args)
+        export_format = request.args.get('format', 'ndjson')
+        return export_response(mongo.db.ratings, EXPORT_FIELDS['ratings'], query, export_format)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@rating_routes.route('/api/ratings/search', methods=['GET'])
+def search_ratings():
+    try:
+        mongo = current_app.mongo
+        
+        # Build optional filters
+        query = {}
+        if request.args.get('item_id'):
+            query['item_id'] = request.args['item_id']
+        if request.args.get('user_id'):
+            try:
+                query['user_id'] = ObjectId(request.args['user_id'])
+            except:
+                return jsonify({"error": "Invalid user_id format"}), 400
+        
+        # Ranked by text relevance using the description text index
+        ratings, pagination = search(mongo.db.ratings, request.args.get('q'), query, request.args)
+        
+        # ObjectIds and dates are encoded by the serializer
+        return render({
+            "ratings": ratings,
+            **pagination
+        })
+        
+    except SearchUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @rating_routes.route('/api/ratings/<rating_id>', methods=['GET'])
 def get_rating(rating_id):
     try:
         mongo = current_app.mongo
         object_id = ObjectId(rating_id)
-        rating_data = mongo.db.ratings.find_one({"_id": object_id})
+        expand = parse_expand(request.args)
+        projection, internal = with_required(
+            parse_fields(request.args, 'ratings'),
+            ['user_id'] if 'user' in expand else []
+        )
+        rating_data = mongo.db.ratings.find_one({"_id": object_id}, projection)
         
         if not rating_data:
             return jsonify({"error": "Rating not found"}), 404
-            
-        # Convert ObjectId to string for JSON response
-        rating_data['_id'] = str(rating_data['_id'])
-        rating_data['user_id'] = str(rating_data['user_id'])
         
-        return jsonify(rating_data), 200
+        if 'user' in expand:
+            expand_users(mongo.db, [rating_data])
+        strip_fields([rating_data], internal)
+            
+        return render(rating_data)
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -138,16 +341,11 @@ def update_rating(rating_id):
         if not existing_rating:
             return jsonify({"error": "Rating not found"}), 404
             
-        # Create Rating object for validation
-        updated_rating = Rating(
-            user_id=str(existing_rating['user_id']),
-            item_id=existing_rating['item_id'],
-            rating=data.get('rating', existing_rating['rating']),
-            description=data.get('description', existing_rating.get('description'))
-        )
-        
         # Validate updated data
-        is_valid, error_message = updated_rating.validate()
+        is_valid, error_message = validate_rating_fields(
+            data.get('rating', existing_rating['rating']),
+            data.get('description', existing_rating.get('description'))
+        )
         if not is_valid:
             return jsonify({"error": error_message}), 400
             
@@ -161,13 +359,26 @@ def update_rating(rating_id):
         if not update_data:
             return jsonify({"error": "No valid fields to update"}), 400
             
-        # Perform update
-        result = mongo.db.ratings.update_one(
-            {"_id": object_id},
-            {"$set": update_data}
+        # Update only if a value changes; the document returned is the one
+        # actually replaced, so concurrent updates apply consistent deltas
+        previous = mongo.db.ratings.find_one_and_update(
+            {"_id": object_id, "$or": [{field: {"$ne": value}} for field, value in update_data.items()]},
+            {"$set": {**update_data, "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.modified_count > 0:
+        if previous:
+            # Update item aggregates and cached listings
+            if 'rating' in update_data:
+                apply_rating_change(
+                    mongo.db,
+                    previous['item_id'],
+                    old_value=previous['rating'],
+                    new_value=update_data['rating'],
+                    created_at=previous['created_at']
+                )
+            invalidate_listing('ratings', [previous['item_id']])
+            
             # Get updated rating data
             updated_data = mongo.db.ratings.find_one({"_id": object_id})
             updated_data['_id'] = str(updated_data['_id'])
@@ -197,6 +408,15 @@ def delete_rating(rating_id):
         result = mongo.db.ratings.delete_one({"_id": object_id})
         
         if result.deleted_count > 0:
+            # Update item aggregates and cached listings
+            apply_rating_change(
+                mongo.db,
+                existing_rating['item_id'],
+                old_value=existing_rating['rating'],
+                created_at=existing_rating['created_at']
+            )
+            invalidate_listing('ratings', [existing_rating['item_id']])
+            
             return jsonify({
                 "message": "Rating deleted successfully",
                 "rating_id": rating_id
@@ -204,5 +424,166 @@ def delete_rating(rating_id):
         else:
             return jsonify({"error": "Failed to delete rating"}), 500
             
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@rating_routes.route('/api/items/<item_id>/stats', methods=['GET'])
+def get_item_stats(item_id):
+    try:
+        mongo = current_app.mongo
+        
+        # Single point read of the precomputed aggregates
+        stats = mongo.db.rating_stats.find_one({"_id": item_id})
+        
+        return jsonify(format_stats(item_id, stats)), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@rating_routes.route('/api/items/top', methods=['GET'])
+def get_top_items():
+    try:
+        mongo = current_app.mongo
+        
+        # Get ranking parameters
+        by = request.args.get('by', 'bayes')
+        limit = int(request.args.get('limit', 10))
+        min_count = int(request.args.get('min_count', 1))
+        window = request.args.get('window')
+        if limit < 1 or limit > 100:
+            return jsonify({"error": "limit must be between 1 and 100"}), 400
+        
+        items = top_items(mongo.db, by=by, limit=limit, min_count=min_count, window=window)
+        
+        return jsonify({
+            "items": items,
+            "by": by,
+            "window": window
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@rating_routes.route('/api/items/ratings/summary', methods=['POST'])
+def get_items_summary():
+    try:
+        mongo = current_app.mongo
+        data = request.get_json()
+        
+        # Validate item list
+        item_ids = data.get('item_ids')
+        if not isinstance(item_ids, list) or not item_ids:
+            return jsonify({"error": "item_ids must be a non-empty list"}), 400
+        if len(item_ids) > 500:
+            return jsonify({"error": "At most 500 item_ids per request"}), 400
+        item_ids = list(dict.fromkeys(str(item_id) for item_id in item_ids))
+        
+        source = data.get('source', 'stats')
+        if source not in ('stats', 'ratings'):
+            return jsonify({"error": "source must be one of: stats, ratings"}), 400
+        
+        summaries = summarize_items(mongo.db, item_ids, source=source)
+        
+        # Columnar layout keeps the payload small for large grids
+        if data.get('layout') == 'columnar':
+            return jsonify(columnar(summaries)), 200
+        return jsonify({"items": summaries}), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@rating_routes.route('/api/items/<item_id>/ratings/me', methods=['PUT'])
+def upsert_my_rating(item_id):
+    try:
+        claims = get_token_claims()
+        data = request.get_json()
+        
+        # Validate required fields
+        if 'rating' not in data:
+            return jsonify({"error": "Missing required fields"}), 400
+        
+        # Check if user exists
+        mongo = current_app.mongo
+        user_id = ObjectId(claims['user_id'])
+        if not user_exists(mongo.db, user_id):
+            return jsonify({"error": "User not found"}), 404
+        
+        # Create rating object for validation
+        new_rating = Rating(
+            user_id=str(user_id),
+            item_id=item_id,
+            rating=data['rating'],
+            description=data.get('description')
+        )
+        
+        is_valid, error_message = new_rating.validate()
+        if not is_valid:
+            return jsonify({"error": error_message}), 400
+        
+        previous = _upsert_rating(mongo, new_rating)
+        return _upsert_response(previous, new_rating)
+        
+    except AuthError as e:
+        return jsonify({"error": str(e)}), 401
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@rating_routes.route('/api/items/<item_id>/similar', methods=['GET'])
+def get_similar_items(item_id):
+    try:
+        mongo = current_app.mongo
+        
+        # Served from the precomputed neighbor index, which holds top_n per item
+        top_n = current_app.config["RECOMMENDATIONS_TOP_N"]
+        limit = request.args.get('limit', '10')
+        if not limit.isdigit() or not 1 <= int(limit) <= top_n:
+            return jsonify({"error": f"limit must be between 1 and {top_n}"}), 400
+        
+        neighbors = similar_items(mongo.db, item_id, limit=int(limit))
+        
+        return jsonify({
+            "item_id": item_id,
+            "similar": neighbors
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@rating_routes.route('/api/items/<item_id>/trend', methods=['GET'])
+def get_item_trend(item_id):
+    try:
+        mongo = current_app.mongo
+        window = parse_window(request.args.get('window', '30d'))
+        granularity = request.args.get('granularity', 'day')
+        
+        # Sums pre-bucketed rollups instead of raw ratings
+        trend = item_trend(mongo.db, item_id, window, granularity=granularity)
+        
+        return jsonify(trend), 200
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@rating_routes.route('/api/items/<item_id>/events', methods=['GET'])
+def stream_item_events(item_id):
+    try:
+        feed = current_app.change_feed
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        
+        # Served from the shared change feed, not a query per client
+        subscriber = feed.subscribe(item_id, last_event_id=last_event_id)
+        
+        return Response(
+            event_stream(feed, subscriber, heartbeat=current_app.config["EVENTS_HEARTBEAT"]),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+        
+    except FeedFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -1,11 +1,18 @@
 from flask import Blueprint, request, jsonify
 from flask import current_app
-from app.models.user import User
+from app.models.user import User, validate_email, validate_password
+from app.services.pagination import paginate
+from app.services.serialization import render
+from app.services.projection import parse_fields
+from app.services.cache import invalidate_user, known_users
+from app.services.passwords import HashingBusy, hash_password, needs_rehash, verify_password
+from app.services.recommendations import recommend_for_user
+from app.services.deletion_jobs import enqueue_user_deletion, format_job
+from app.services.indexes import unique_indexes_ready
 from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
 import jwt
 from datetime import datetime, timedelta
-from werkzeug.security import check_password_hash
 
 user_routes = Blueprint('user_routes', __name__)
 
@@ -18,24 +25,25 @@ def register():
         if not all(key in data for key in ['email', 'password']):
             return jsonify({"error": "Missing required fields"}), 400
             
-        # Validate email format
-        if '@' not in data['email']:
-            return jsonify({"error": "Invalid email format"}), 400
-            
-        # Validate password length
-        if len(data['password']) < 6:
-            return jsonify({"error": "Password must be at least 6 characters"}), 400
+        # Validate email format and password length
+        error_message = validate_email(data['email']) or validate_password(data['password'])
+        if error_message:
+            return jsonify({"error": error_message}), 400
         
-        # Create new user object
+        # Create new user object (password hashed on the worker pool)
         new_user = User(
             email=data['email'],
-            password=data['password'],
+            password_hash=hash_password(data['password']),
             name=data.get('name')
         )
         
-        # Insert user using the mongo instance from app context
+        # Insert user using the mongo instance from app context; the unique
+        # email index rejects duplicates, checked here only if it cannot be built
         mongo = current_app.mongo
+        if not unique_indexes_ready(mongo.db, 'users') and mongo.db.users.find_one({"email": new_user.email}, {"_id": 1}):
+            return jsonify({"error": "Email already exists"}), 409
         result = mongo.db.users.insert_one(new_user.to_dict())
+        known_users.set(result.inserted_id, True)
         
         # Generate JWT token
         token = jwt.encode(
@@ -60,6 +68,8 @@ def register():
         
     except DuplicateKeyError:
         return jsonify({"error": "Email already exists"}), 409
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -80,8 +90,18 @@ def login():
             return jsonify({"error": "User not found"}), 404
             
         # Check password
-        if not check_password_hash(user['password'], data['password']):
+        if not verify_password(user['password'], data['password']):
             return jsonify({"error": "Invalid password"}), 401
+        
+        # Upgrade hashes made with outdated algorithm or cost parameters
+        if needs_rehash(user['password']):
+            try:
+                mongo.db.users.update_one(
+                    {"_id": user['_id']},
+                    {"$set": {"password": hash_password(data['password'])}}
+                )
+            except HashingBusy:
+                pass
             
         # Generate JWT token
         token = jwt.encode(
@@ -104,6 +124,8 @@ def login():
             }
         }), 200
         
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -112,16 +134,15 @@ def get_user(user_id):
     try:
         mongo = current_app.mongo
         object_id = ObjectId(user_id)
-        user_data = mongo.db.users.find_one({"_id": object_id})
+        user_data = mongo.db.users.find_one({"_id": object_id}, parse_fields(request.args, 'users'))
         
         if not user_data:
             return jsonify({"error": "User not found"}), 404
             
-        user_data['_id'] = str(user_data['_id'])
-        user_data.pop('password', None)
-        
-        return jsonify(user_data), 200
+        return render(user_data)
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -144,17 +165,17 @@ def update_user(user_id):
         if 'name' in data:
             update_data['name'] = data['name']
         if 'email' in data:
-            # Check if email already exists
+            # The unique email index rejects a taken address; query only when it is missing
             if data['email'] != existing_user['email']:
-                email_exists = mongo.db.users.find_one({"email": data['email']})
-                if email_exists:
+                if not unique_indexes_ready(mongo.db, 'users') and mongo.db.users.find_one({"email": data['email']}, {"_id": 1}):
                     return jsonify({"error": "Email already exists"}), 409
             update_data['email'] = data['email']
         if 'password' in data:
             # Validate new password length
-            if len(data['password']) < 6:
-                return jsonify({"error": "Password must be at least 6 characters"}), 400
-            update_data['password'] = generate_password_hash(data['password'])
+            error_message = validate_password(data['password'])
+            if error_message:
+                return jsonify({"error": error_message}), 400
+            update_data['password'] = hash_password(data['password'])
             
         if not update_data:
             return jsonify({"error": "No valid fields to update"}), 400
@@ -164,12 +185,12 @@ def update_user(user_id):
             {"_id": object_id},
             {"$set": update_data}
         )
+        invalidate_user(object_id)
         
         if result.modified_count > 0:
             # Get updated user data
-            updated_user = mongo.db.users.find_one({"_id": object_id})
+            updated_user = mongo.db.users.find_one({"_id": object_id}, {"password": 0})
             updated_user['_id'] = str(updated_user['_id'])
-            updated_user.pop('password', None)
             return jsonify({
                 "message": "User updated successfully",
                 "user": updated_user
@@ -177,6 +198,10 @@ def update_user(user_id):
         else:
             return jsonify({"message": "No changes made"}), 200
             
+    except DuplicateKeyError:
+        return jsonify({"error": "Email already exists"}), 409
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -191,16 +216,25 @@ def delete_user(user_id):
         if not existing_user:
             return jsonify({"error": "User not found"}), 404
             
+        # Ratings and comments are deleted or anonymized by a background job
+        content_mode = request.args.get('content', 'delete')
+        if content_mode not in ('delete', 'anonymize'):
+            return jsonify({"error": "content must be one of: delete, anonymize"}), 400
+        
+        # Enqueue first: the job deletes the user too if this request dies early
+        job = enqueue_user_deletion(mongo.db, object_id, mode=content_mode)
+        
         # Delete user
-        result = mongo.db.users.delete_one({"_id": object_id})
+        mongo.db.users.delete_one({"_id": object_id})
+        invalidate_user(object_id)
+        if current_app.deletion_worker:
+            current_app.deletion_worker.notify()
         
-        if result.deleted_count > 0:
-            return jsonify({
-                "message": "User deleted successfully",
-                "user_id": user_id
-            }), 200
-        else:
-            return jsonify({"error": "Failed to delete user"}), 500
+        return jsonify({
+            "message": "User deleted successfully",
+            "user_id": user_id,
+            "deletion_job_id": str(job['_id'])
+        }), 200
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -210,31 +244,52 @@ def get_all_users():
     try:
         mongo = current_app.mongo
         
-        # Get pagination parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
+        # Get users with pagination; the password hash never leaves the database
+        users, pagination = paginate(mongo.db.users, {}, request.args, projection=parse_fields(request.args, 'users'))
         
-        # Calculate skip value
-        skip = (page - 1) * per_page
+        # ObjectIds and dates are encoded by the serializer
+        return render({
+            "users": users,
+            **pagination
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@user_routes.route('/api/users/<user_id>/recommendations', methods=['GET'])
+def get_recommendations(user_id):
+    try:
+        mongo = current_app.mongo
+        object_id = ObjectId(user_id)
         
-        # Get total count
-        total_users = mongo.db.users.count_documents({})
+        # Neighbor lists hold at most top_n items, so larger limits cannot be filled
+        top_n = current_app.config["RECOMMENDATIONS_TOP_N"]
+        limit = request.args.get('limit', '10')
+        if not limit.isdigit() or not 1 <= int(limit) <= top_n:
+            return jsonify({"error": f"limit must be between 1 and {top_n}"}), 400
         
-        # Get users with pagination
-        users = list(mongo.db.users.find().skip(skip).limit(per_page))
+        recommendations = recommend_for_user(mongo.db, object_id, limit=int(limit))
         
-        # Process users for response
-        for user in users:
-            user['_id'] = str(user['_id'])
-            user.pop('password', None)
-            
         return jsonify({
-            "users": users,
-            "page": page,
-            "per_page": per_page,
-            "total": total_users,
-            "total_pages": (total_users + per_page - 1) // per_page
+            "user_id": user_id,
+            "recommendations": recommendations
         }), 200
         
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@user_routes.route('/api/users/deletion-jobs/<job_id>', methods=['GET'])
+def get_deletion_job(job_id):
+    try:
+        mongo = current_app.mongo
+        job = mongo.db.deletion_jobs.find_one({"_id": ObjectId(job_id)})
+        
+        if not job:
+            return jsonify({"error": "Deletion job not found"}), 404
+        
+        return jsonify(format_job(job)), 200
+        
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
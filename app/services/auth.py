@@ -0,0 +1,38 @@
+from flask import request, current_app
+from app.services.cache import token_claims
+import jwt
+import time
+
+class AuthError(Exception):
+    """Raised when a request does not carry a valid JWT"""
+
+def get_token_claims():
+    """Decode and verify the Bearer token from the Authorization header"""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        raise AuthError("Missing bearer token")
+    
+    token = header[len('Bearer '):]
+    
+    claims = token_claims.get(token)
+    if claims is not None:
+        return claims
+    
+    try:
+        claims = jwt.decode(
+            token,
+            current_app.config['JWT_SECRET_KEY'],
+            algorithms=['HS256']
+        )
+    except jwt.ExpiredSignatureError:
+        raise AuthError("Token has expired")
+    except jwt.InvalidTokenError:
+        raise AuthError("Invalid token")
+    
+    # Never cache a token beyond its own expiry
+    ttl = token_claims.ttl
+    if 'exp' in claims:
+        ttl = min(ttl, claims['exp'] - time.time())
+    if ttl > 0:
+        token_claims.set(token, claims, ttl=ttl)
+    return claims
\ No newline at end of file
@@ -0,0 +1,138 @@
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app.models.rating import Rating, validate_ratings
+from app.services.rating_stats import apply_rating_deltas, merge_deltas, rating_delta
+from app.services.response_cache import invalidate_listing
+from app.services.trends import add_rollup_delta
+
+DUPLICATE_KEY_ERROR = 11000
+
+def _check_row(row):
+    """Structural checks for one input row; returns an error message or None"""
+    if not isinstance(row, dict):
+        return "Row must be a JSON object"
+    
+    if not all(key in row for key in ['user_id', 'item_id', 'rating']):
+        return "Missing required fields"
+    
+    try:
+        ObjectId(row['user_id'])
+    except Exception:
+        return "Invalid user_id format"
+    return None
+
+def _build_ratings(rows):
+    """Validate a chunk of rows as a batch; Rating objects are only built for valid rows
+    
+    Returns a list of (rating, error message) pairs, one per row.
+    """
+    errors = [_check_row(row) for row in rows]
+    field_errors = iter(validate_ratings([row for row, error in zip(rows, errors) if not error]))
+    
+    built = []
+    for row, error in zip(rows, errors):
+        error = error or next(field_errors)
+        if error:
+            built.append((None, error))
+        else:
+            built.append((Rating(
+                user_id=row['user_id'],
+                item_id=row['item_id'],
+                rating=row['rating'],
+                description=row.get('description')
+            ), None))
+    return built
+
+def _insert_chunk(db, chunk, ordered):
+    """Insert validated ratings and return {position: error message} for failed rows"""
+    try:
+        db.ratings.insert_many([rating.to_dict() for _, rating in chunk], ordered=ordered)
+        return {}
+    except BulkWriteError as e:
+        failed = {}
+        for error in e.details.get('writeErrors', []):
+            if error.get('code') == DUPLICATE_KEY_ERROR:
+                failed[error['index']] = "Rating already exists for this item"
+            else:
+                failed[error['index']] = error.get('errmsg', "Write failed")
+        return failed
+
+def ingest_chunk(db, rows, start_index, ordered):
+    """Validate, resolve users and insert one chunk of rows
+    
+    Returns the per-row results and whether an ordered import must stop.
+    """
+    results = {}
+    candidates = []
+    for offset, (rating, error) in enumerate(_build_ratings(rows)):
+        if error:
+            results[start_index + offset] = {"status": "error", "error": error}
+        else:
+            candidates.append((start_index + offset, rating))
+    
+    # Resolve all referenced users with one query
+    user_ids = list({rating.user_id for _, rating in candidates})
+    known_users = set()
+    if user_ids:
+        known_users = {user['_id'] for user in db.users.find({"_id": {"$in": user_ids}}, {"_id": 1})}
+    for index, rating in candidates:
+        if rating.user_id not in known_users:
+            results[index] = {"status": "error", "error": "User not found"}
+    
+    # In ordered mode nothing after the first failed row is written
+    to_insert = [(index, rating) for index, rating in candidates if index not in results]
+    if ordered and results:
+        first_error = min(results)
+        to_insert = [(index, rating) for index, rating in to_insert if index < first_error]
+    
+    failed = _insert_chunk(db, to_insert, ordered) if to_insert else {}
+    
+    deltas = {}
+    rollups = {}
+    for position, (index, rating) in enumerate(to_insert):
+        if position in failed:
+            results[index] = {"status": "error", "error": failed[position]}
+        elif not (ordered and failed and position > min(failed)):
+            results[index] = {"status": "created", "rating_id": str(rating._id)}
+            delta = rating_delta(rating.rating)
+            merge_deltas(deltas.setdefault(rating.item_id, {}), delta)
+            add_rollup_delta(rollups, rating.item_id, rating.created_at, delta)
+    
+    # Update derived aggregates and cached listings once per chunk
+    apply_rating_deltas(db, deltas, rollups)
+    invalidate_listing('ratings', deltas.keys())
+    
+    errors = [index for index, result in results.items() if result['status'] == 'error']
+    stopped = ordered and bool(errors)
+    report = []
+    for index in range(start_index, start_index + len(rows)):
+        if stopped and index > min(errors):
+            report.append({"index": index, "status": "skipped"})
+        else:
+            report.append({"index": index, **results[index]})
+    return report, stopped
+
+def ingest_ratings(db, rows, ordered=False, chunk_size=1000):
+    """Import an iterable of rating rows in chunks and build a per-row report"""
+    report = []
+    chunk = []
+    start_index = 0
+    stopped = False
+    
+    for index, row in enumerate(rows):
+        if stopped:
+            report.append({"index": index, "status": "skipped"})
+            continue
+        
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            chunk_report, stopped = ingest_chunk(db, chunk, start_index, ordered)
+            report.extend(chunk_report)
+            start_index = index + 1
+            chunk = []
+    
+    if chunk and not stopped:
+        chunk_report, stopped = ingest_chunk(db, chunk, start_index, ordered)
+        report.extend(chunk_report)
+    
+    return report
\ No newline at end of file
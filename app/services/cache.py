@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a time-to-live"""
+    
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key, default=None):
+        """Return a cached value and mark it most recently used"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key):
+        """Drop a single entry if present"""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def invalidate_matching(self, predicate):
+        """Drop every entry whose value satisfies the predicate"""
+        with self._lock:
+            for key in [key for key, (value, _) in self._data.items() if predicate(value)]:
+                del self._data[key]
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self):
+        """Counters used to size the cache"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+# Known user ids, so writes can skip the users lookup
+known_users = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", 10000)),
+    ttl=int(os.getenv("USER_CACHE_TTL", 300))
+)
+
+# Decoded JWT claims keyed by the raw token
+token_claims = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", 10000)),
+    ttl=int(os.getenv("TOKEN_CACHE_TTL", 300))
+)
+
+def user_exists(db, user_id):
+    """Check a user id against the cache before falling back to MongoDB"""
+    if known_users.get(user_id):
+        return True
+    
+    if db.users.find_one({"_id": user_id}, {"_id": 1}) is None:
+        return False
+    
+    known_users.set(user_id, True)
+    return True
+
+def invalidate_user(user_id):
+    """Forget everything cached about a user after it changes or is deleted"""
+    known_users.invalidate(user_id)
+    token_claims.invalidate_matching(lambda claims: claims.get('user_id') == str(user_id))
+
+def cache_stats():
+    return {
+        "users": known_users.stats(),
+        "tokens": token_claims.stats()
+    }
\ No newline at end of file
@@ -0,0 +1,257 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.services.cache import invalidate_user, known_users
+from app.services.indexes import unique_indexes_ready
+from app.services.rating_stats import apply_rating_deltas, merge_deltas, rating_delta
+from app.services.response_cache import invalidate_listing
+from app.services.trends import add_rollup_delta
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("ratings", "comments")
+MODES = ("delete", "anonymize")
+
+# A running job whose lease lapses is assumed crashed and can be claimed again
+LEASE = timedelta(minutes=5)
+
+# Failed runs are retried with exponential backoff before a job is marked failed
+MAX_ATTEMPTS = 8
+RETRY_BACKOFF = timedelta(seconds=30)
+MAX_RETRY_BACKOFF = timedelta(hours=1)
+
+# Other processes accept writes from a cached user for up to the cache TTL;
+# a second pass after that (plus a margin for in-flight requests) removes them
+SWEEP_MARGIN = timedelta(seconds=60)
+
+def enqueue_user_deletion(db, user_id, mode='delete'):
+    """Record the job that deletes a user and removes or anonymizes everything they wrote
+    
+    Called before the user document is deleted. There is one job per user,
+    so a retried request returns the existing job.
+    """
+    if mode not in MODES:
+        raise ValueError("mode must be one of: delete, anonymize")
+    unique_indexes_ready(db, 'deletion_jobs')
+    now = datetime.utcnow()
+    job = {
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "mode": mode,
+        "status": "pending",
+        "phase": PHASES[0],
+        "last_id": None,
+        "processed": {phase: 0 for phase in PHASES},
+        "sweep": False,
+        "not_before": None,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+        "lease_until": None,
+        "error": None
+    }
+    
+    def write():
+        return db.deletion_jobs.find_one_and_update(
+            {"user_id": user_id},
+            {"$setOnInsert": job},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    
+    # Concurrent requests race on the unique index; the loser reads the winner's job
+    try:
+        return write()
+    except DuplicateKeyError:
+        return write()
+
+def claim_job(db):
+    """Atomically take a due pending job, or a running one whose worker stopped renewing"""
+    now = datetime.utcnow()
+    return db.deletion_jobs.find_one_and_update(
+        {"$or": [
+            {"status": "pending", "not_before": None},
+            {"status": "pending", "not_before": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}}
+        ]},
+        {"$set": {"status": "running", "lease_until": now + LEASE, "updated_at": now}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def _process_batch(db, job, collection, batch_size):
+    """Handle the next _id range of a user's documents; returns how many were processed"""
+    range_filter = {"user_id": job['user_id']}
+    if job['last_id'] is not None:
+        range_filter["_id"] = {"$gt": job['last_id']}
+    
+    docs = list(db[collection].find(
+        range_filter,
+        {"item_id": 1, "rating": 1, "created_at": 1}
+    ).sort("_id", 1).limit(batch_size))
+    if not docs:
+        return 0, None
+    
+    # Bound the write to exactly the _id range that was read
+    batch_filter = {"user_id": job['user_id'], "_id": {"$gte": docs[0]['_id'], "$lte": docs[-1]['_id']}}
+    if job['mode'] == 'delete':
+        db[collection].delete_many(batch_filter)
+        if collection == 'ratings':
+            deltas = {}
+            rollups = {}
+            for doc in docs:
+                delta = rating_delta(doc['rating'], -1)
+                merge_deltas(deltas.setdefault(doc['item_id'], {}), delta)
+                add_rollup_delta(rollups, doc['item_id'], doc['created_at'], delta)
+            apply_rating_deltas(db, deltas, rollups)
+    else:
+        # A fresh id per document keeps the unique (user_id, item_id) index satisfied
+        db[collection].bulk_write([
+            UpdateOne({"_id": doc['_id']}, {"$set": {"user_id": ObjectId(), "anonymized": True}})
+            for doc in docs
+        ], ordered=False)
+    
+    invalidate_listing(collection, [doc['item_id'] for doc in docs])
+    return len(docs), docs[-1]['_id']
+
+def run_job(db, job, batch_size=500):
+    """Work through a claimed job batch by batch, checkpointing after each one
+    
+    Progress (phase and last processed _id) is saved after every batch, so
+    a crashed job resumes from its last checkpoint. A crash between a batch
+    write and its aggregate update can leave rating_stats slightly off;
+    rebuild-rating-stats repairs that.
+    
+    The job deletes the user document itself, so content is never orphaned
+    if the request dies between enqueueing and deleting. The first pass is
+    followed by a sweep once user caches in other processes have expired.
+    """
+    try:
+        db.users.delete_one({"_id": job['user_id']})
+        invalidate_user(job['user_id'])
+        
+        for phase in PHASES[PHASES.index(job['phase']):]:
+            if job['phase'] != phase:
+                job['phase'], job['last_id'] = phase, None
+            while True:
+                processed, last_id = _process_batch(db, job, phase, batch_size)
+                if not processed:
+                    break
+                job['last_id'] = last_id
+                job['processed'][phase] += processed
+                now = datetime.utcnow()
+                db.deletion_jobs.update_one(
+                    {"_id": job['_id']},
+                    {"$set": {
+                        "phase": phase,
+                        "last_id": last_id,
+                        f"processed.{phase}": job['processed'][phase],
+                        "lease_until": now + LEASE,
+                        "updated_at": now
+                    }}
+                )
+        
+        now = datetime.utcnow()
+        if not job.get('sweep'):
+            # Catch writes accepted by processes that still had the user cached
+            db.deletion_jobs.update_one(
+                {"_id": job['_id']},
+                {"$set": {
+                    "status": "pending",
+                    "phase": PHASES[0],
+                    "last_id": None,
+                    "sweep": True,
+                    "not_before": now + timedelta(seconds=known_users.ttl) + SWEEP_MARGIN,
+                    "lease_until": None,
+                    "updated_at": now
+                }}
+            )
+            return
+        
+        db.deletion_jobs.update_one(
+            {"_id": job['_id']},
+            {"$set": {"status": "completed", "lease_until": None, "updated_at": now}}
+        )
+    except Exception as e:
+        # The user is already gone, so giving up would orphan their content;
+        # retry from the last checkpoint unless the job keeps failing
+        attempts = job.get('attempts', 0) + 1
+        now = datetime.utcnow()
+        update = {"error": str(e), "attempts": attempts, "lease_until": None, "updated_at": now}
+        if attempts < MAX_ATTEMPTS:
+            logger.warning("Deletion job %s failed (attempt %d), retrying", job['_id'], attempts, exc_info=True)
+            update.update(status="pending", not_before=now + min(RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_BACKOFF))
+        else:
+            logger.exception("Deletion job %s failed after %d attempts", job['_id'], attempts)
+            update["status"] = "failed"
+        db.deletion_jobs.update_one({"_id": job['_id']}, {"$set": update})
+
+def retry_failed_jobs(db):
+    """Return failed jobs to pending with a fresh attempt budget; returns how many"""
+    result = db.deletion_jobs.update_many(
+        {"status": "failed"},
+        {"$set": {"status": "pending", "attempts": 0, "not_before": None, "updated_at": datetime.utcnow()}}
+    )
+    return result.modified_count
+
+def run_pending_jobs(db, batch_size=500):
+    """Claim and run jobs until none are left; returns how many ran"""
+    count = 0
+    job = claim_job(db)
+    while job:
+        run_job(db, job, batch_size=batch_size)
+        count += 1
+        job = claim_job(db)
+    return count
+
+class DeletionJobWorker:
+    """Background thread that runs deletion jobs, including ones left by crashed processes"""
+    
+    def __init__(self, app, batch_size=500, poll_interval=30):
+        self.app = app
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="deletion-job-worker", daemon=True)
+        self._thread.start()
+    
+    def notify(self):
+        """Wake the worker after a new job was enqueued"""
+        self._wake.set()
+    
+    def _run(self):
+        # The first poll waits too, so startup does not open a MongoDB connection
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    run_pending_jobs(self.app.mongo.db, batch_size=self.batch_size)
+            except Exception:
+                logger.exception("Deletion job worker iteration failed")
+
+def init_deletion_jobs(app):
+    """Start the background worker when DELETION_JOBS_WORKER is set"""
+    app.deletion_worker = None
+    if app.config.get("DELETION_JOBS_WORKER"):
+        app.deletion_worker = DeletionJobWorker(app, batch_size=app.config["DELETION_JOBS_BATCH_SIZE"])
+    return app.deletion_worker
+
+def format_job(job):
+    """Convert a deletion job document to the public response shape"""
+    return {
+        "job_id": str(job['_id']),
+        "user_id": str(job['user_id']),
+        "mode": job['mode'],
+        "status": job['status'],
+        "phase": job['phase'],
+        "processed": job['processed'],
+        "attempts": job.get('attempts', 0),
+        "sweep_at": job.get('not_before') if job.get('sweep') else None,
+        "created_at": job['created_at'],
+        "updated_at": job['updated_at'],
+        "error": job.get('error')
+    }
\ No newline at end of file
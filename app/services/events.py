@@ -0,0 +1,265 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from app.services.cache import TTLCache
+from app.services.serialization import dumps_json
+
+logger = logging.getLogger(__name__)
+
+COLLECTIONS = {"ratings": "rating", "comments": "comment"}
+ACTIONS = {"insert": "created", "update": "updated", "replace": "updated", "delete": "deleted"}
+
+# Change streams need a replica set or sharded cluster
+CHANGE_STREAM_UNSUPPORTED = (40573, 40324)
+# The resume token fell off the oplog; resuming from it can never succeed
+CHANGE_STREAM_HISTORY_LOST = 286
+
+class FeedFull(Exception):
+    """Raised when the process already serves the maximum number of subscribers"""
+
+class Subscriber:
+    """One SSE connection; events beyond the buffer size close it so the client reconnects"""
+    
+    def __init__(self, item_id, buffer_size):
+        self.item_id = item_id
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=buffer_size)
+    
+    def push(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+    
+    def next_event(self, timeout):
+        """Next event, or None when nothing arrived within the timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+def event_from_change(change):
+    """Turn a change stream document into a feed event, or None if it cannot be routed"""
+    kind = COLLECTIONS.get(change.get("ns", {}).get("coll"))
+    action = ACTIONS.get(change.get("operationType"))
+    if not kind or not action:
+        return None
+    
+    # Deletes only carry the item id when pre-images are enabled
+    doc = change.get("fullDocumentBeforeChange") if action == "deleted" else change.get("fullDocument")
+    if not doc or "item_id" not in doc:
+        return None
+    
+    data = {"_id": doc['_id'], "item_id": doc['item_id']} if action == "deleted" else doc
+    return {"id": change['_id']['_data'], "event": f"{kind}.{action}", "item_id": doc['item_id'], "data": data}
+
+def format_sse(event):
+    """Encode an event in the text/event-stream wire format"""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {dumps_json(event['data']).decode()}\n\n"
+
+class ChangeFeed:
+    """Per-process fan-out of rating and comment changes to SSE subscribers
+    
+    One background thread follows a single change stream on the database,
+    resuming from its last token after errors. On deployments without
+    change streams it polls instead, once per interval for all subscribers.
+    Recent events are kept so reconnecting clients can resume from
+    Last-Event-ID.
+    """
+    
+    def __init__(self, app, buffer_size=100, history_size=1000, max_subscribers=1000,
+                 poll_interval=2.0, mode="auto", pre_images=False):
+        self.app = app
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.poll_interval = poll_interval
+        self.mode = mode
+        self.pre_images = pre_images
+        self.active_mode = None
+        self.resume_token = None
+        self._subscribers = {}
+        self._history = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._poll_prefix = str(ObjectId())
+        self._poll_sequence = 0
+        self.counters = {"published": 0, "overflowed": 0, "resets": 0}
+    
+    def subscribe(self, item_id, last_event_id=None):
+        """Register a subscriber, replaying buffered events after last_event_id"""
+        subscriber = Subscriber(item_id, self.buffer_size)
+        with self._lock:
+            if sum(len(group) for group in self._subscribers.values()) >= self.max_subscribers:
+                raise FeedFull("Too many event subscribers, retry shortly")
+            self._subscribers.setdefault(item_id, set()).add(subscriber)
+            
+            if last_event_id:
+                ids = [event['id'] for event in self._history]
+                if last_event_id in ids:
+                    for event in list(self._history)[ids.index(last_event_id) + 1:]:
+                        if event['item_id'] == item_id:
+                            subscriber.push(event)
+                else:
+                    # Too old or from another process: the client refetches over REST
+                    self.counters["resets"] += 1
+                    subscriber.push({"id": last_event_id, "event": "reset", "item_id": item_id, "data": {"item_id": item_id}})
+            
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+                self._thread.start()
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            group = self._subscribers.get(subscriber.item_id)
+            if group:
+                group.discard(subscriber)
+                if not group:
+                    del self._subscribers[subscriber.item_id]
+            if subscriber.overflowed:
+                self.counters["overflowed"] += 1
+    
+    def publish(self, event):
+        with self._lock:
+            self._history.append(event)
+            self.counters["published"] += 1
+            subscribers = list(self._subscribers.get(event['item_id'], ()))
+        for subscriber in subscribers:
+            subscriber.push(event)
+    
+    def _subscribed_items(self):
+        with self._lock:
+            return list(self._subscribers)
+    
+    def _run(self):
+        while True:
+            try:
+                db = self.app.mongo.db
+                if self.mode == "poll":
+                    self._poll(db)
+                else:
+                    self._watch(db)
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED and self.mode == "auto":
+                    logger.warning("Change streams unavailable, polling every %.1fs instead", self.poll_interval)
+                    self.mode = "poll"
+                    continue
+                if e.code == CHANGE_STREAM_HISTORY_LOST and self.resume_token is not None:
+                    self._history_lost()
+                    continue
+                logger.exception("Change feed failed, restarting")
+            except Exception:
+                logger.exception("Change feed failed, restarting")
+            time.sleep(1)
+    
+    def _history_lost(self):
+        """Restart the stream from now and tell every subscriber to refetch what it missed"""
+        logger.warning("Change stream resume point is no longer in the oplog; restarting from now, events in between are lost")
+        self.resume_token = None
+        with self._lock:
+            # Buffered events end before the gap, so replaying them would hide it
+            self._history.clear()
+            subscribers = [subscriber for group in self._subscribers.values() for subscriber in group]
+            self.counters["resets"] += len(subscribers)
+        for subscriber in subscribers:
+            subscriber.push({"id": "", "event": "reset", "item_id": subscriber.item_id, "data": {"item_id": subscriber.item_id}})
+    
+    def _watch(self, db):
+        """Follow one change stream for both collections, resuming after errors"""
+        options = {"full_document": "updateLookup"}
+        if self.pre_images:
+            options["full_document_before_change"] = "whenAvailable"
+        pipeline = [{"$match": {"ns.coll": {"$in": list(COLLECTIONS)}}}]
+        
+        with db.watch(pipeline, resume_after=self.resume_token, max_await_time_ms=1000, **options) as stream:
+            self.active_mode = "change_stream"
+            while stream.alive:
+                change = stream.try_next()
+                self.resume_token = stream.resume_token
+                if change is None:
+                    continue
+                event = event_from_change(change)
+                if event:
+                    self.publish(event)
+    
+    def _poll(self, db):
+        """Fallback for standalone servers: query new and updated documents for subscribed items
+        
+        Windows overlap so late writes are not missed; already sent versions
+        are skipped. Deletes are not visible to polling.
+        """
+        self.active_mode = "poll"
+        overlap = timedelta(seconds=max(2 * self.poll_interval, 5))
+        sent = TTLCache(maxsize=100000, ttl=overlap.total_seconds() * 2)
+        since = datetime.utcnow() - overlap
+        while True:
+            time.sleep(self.poll_interval)
+            started = datetime.utcnow()
+            items = self._subscribed_items()
+            if items:
+                for collection, kind in COLLECTIONS.items():
+                    query = {
+                        "item_id": {"$in": items},
+                        "$or": [{"created_at": {"$gt": since}}, {"updated_at": {"$gt": since}}]
+                    }
+                    for doc in db[collection].find(query).sort("_id", 1):
+                        changed_at = doc.get('updated_at') or doc['created_at']
+                        if sent.get((doc['_id'], changed_at)):
+                            continue
+                        sent.set((doc['_id'], changed_at), True)
+                        self._poll_sequence += 1
+                        updated = doc.get('updated_at') and doc['updated_at'] > doc['created_at']
+                        self.publish({
+                            "id": f"poll-{self._poll_prefix}-{self._poll_sequence}",
+                            "event": f"{kind}.{'updated' if updated else 'created'}",
+                            "item_id": doc['item_id'],
+                            "data": doc
+                        })
+            since = started - overlap
+    
+    def stats(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "mode": self.active_mode,
+                "subscribers": sum(len(group) for group in self._subscribers.values()),
+                "items": len(self._subscribers),
+                "history": len(self._history)
+            }
+
+def enable_pre_images(db):
+    """Record pre-images on the watched collections so deletes can be routed to their item (MongoDB 6.0+)"""
+    for collection in COLLECTIONS:
+        db.command("collMod", collection, changeStreamPreAndPostImages={"enabled": True})
+    return list(COLLECTIONS)
+
+def init_change_feed(app):
+    """Create the process-wide feed; its thread starts with the first subscriber"""
+    app.change_feed = ChangeFeed(
+        app,
+        buffer_size=app.config["EVENTS_BUFFER_SIZE"],
+        history_size=app.config["EVENTS_HISTORY_SIZE"],
+        max_subscribers=app.config["EVENTS_MAX_SUBSCRIBERS"],
+        poll_interval=app.config["EVENTS_POLL_INTERVAL"],
+        mode=app.config["EVENTS_MODE"],
+        pre_images=app.config["EVENTS_PRE_IMAGES"]
+    )
+    return app.change_feed
+
+def event_stream(feed, subscriber, heartbeat=15):
+    """SSE body generator; comments keep idle connections open and detect disconnects"""
+    try:
+        yield "retry: 3000\n\n"
+        while not subscriber.overflowed:
+            event = subscriber.next_event(timeout=heartbeat)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        feed.unsubscribe(subscriber)
\ No newline at end of file
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from datetime import datetime
+from bson import ObjectId
+from flask import Response, stream_with_context
+
+EXPORT_FIELDS = {
+    "ratings": ["_id", "user_id", "item_id", "rating", "description", "created_at"],
+    "comments": ["_id", "user_id", "item_id", "content", "created_at"]
+}
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+BATCH_SIZE = 1000
+
+def build_export_query(args):
+    """Build the export filter from user_id, item_id and since query params"""
+    query = {}
+    if args.get('user_id'):
+        try:
+            query['user_id'] = ObjectId(args['user_id'])
+        except Exception:
+            raise ValueError("Invalid user_id format")
+    if args.get('item_id'):
+        query['item_id'] = args['item_id']
+    if args.get('since'):
+        try:
+            query['created_at'] = {"$gte": datetime.fromisoformat(args['since'])}
+        except ValueError:
+            raise ValueError("since must be an ISO 8601 timestamp")
+    return query
+
+def _plain_value(value):
+    """Convert BSON values to JSON/CSV friendly ones"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _ndjson_lines(cursor, fields):
+    for doc in cursor:
+        yield json.dumps({field: _plain_value(doc.get(field)) for field in fields}) + "\n"
+
+def _csv_chunks(cursor, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    
+    # Flush the buffer every BATCH_SIZE rows so memory stays constant
+    for count, doc in enumerate(cursor, start=1):
+        writer.writerow([_plain_value(doc.get(field)) for field in fields])
+        if count % BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def export_response(collection, fields, query, export_format):
+    """Stream every matching document from a server-side cursor"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError("format must be one of: ndjson, csv")
+    
+    cursor = collection.find(
+        query,
+        {field: 1 for field in fields}
+    ).sort([("created_at", 1), ("_id", 1)]).batch_size(BATCH_SIZE)
+    
+    if export_format == 'csv':
+        body = _csv_chunks(cursor, fields)
+    else:
+        body = _ndjson_lines(cursor, fields)
+    
+    return Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format])
\ No newline at end of file
@@ -0,0 +1,152 @@
+import logging
+import threading
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+from app.services.pagination import SORT_ORDER, encode_cursor, keyset_filter
+
+logger = logging.getLogger(__name__)
+
+# Declared indexes per collection; applied idempotently by ensure_indexes
+INDEXES = {
+    "ratings": [
+        IndexModel([("item_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="item_created"),
+        IndexModel([("user_id", ASCENDING), ("item_id", ASCENDING)], name="user_item_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_created"),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created"),
+        IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_range"),
+        IndexModel([("item_id", ASCENDING), ("updated_at", DESCENDING)], name="item_updated"),
+        IndexModel([("description", TEXT)], name="description_text")
+    ],
+    "comments": [
+        IndexModel([("item_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="item_created"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_created"),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created"),
+        IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_range"),
+        IndexModel([("item_id", ASCENDING), ("updated_at", DESCENDING)], name="item_updated"),
+        IndexModel([("content", TEXT)], name="content_text")
+    ],
+    "rating_stats": [
+        IndexModel([("bayes_score", DESCENDING), ("_id", ASCENDING)], name="bayes_rank"),
+        IndexModel([("wilson_score", DESCENDING), ("_id", ASCENDING)], name="wilson_rank")
+    ],
+    "rating_rollups": [
+        IndexModel([("item_id", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING)], name="item_bucket"),
+        IndexModel([("granularity", ASCENDING), ("bucket", ASCENDING)], name="granularity_bucket"),
+        IndexModel([("expire_at", ASCENDING)], name="expire_at_ttl", expireAfterSeconds=0)
+    ],
+    "deletion_jobs": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created"),
+        IndexModel([("user_id", ASCENDING)], name="user_unique", unique=True)
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created")
+    ]
+}
+
+_ready = {}
+_ready_lock = threading.Lock()
+
+def _declared_ready(db, collection_name, kind, select):
+    """Build the declared indexes picked by select once per process
+    
+    Returns False when they cannot be built; that outcome is remembered,
+    while transient errors are retried on the next call.
+    """
+    key = (collection_name, kind)
+    ready = _ready.get(key)
+    if ready is not None:
+        return ready
+    
+    with _ready_lock:
+        ready = _ready.get(key)
+        if ready is None:
+            indexes = [index for index in INDEXES.get(collection_name, []) if select(index.document)]
+            try:
+                if indexes:
+                    db[collection_name].create_indexes(indexes)
+                ready = _ready[key] = True
+            except OperationFailure:
+                logger.exception("%s indexes on %s cannot be built", kind.capitalize(), collection_name)
+                ready = _ready[key] = False
+            except PyMongoError:
+                # Transient: retried by the next call
+                logger.exception("%s indexes on %s could not be verified", kind.capitalize(), collection_name)
+                ready = False
+    return ready
+
+def unique_indexes_ready(db, collection_name):
+    """Build a collection's declared unique indexes once per process
+    
+    Writes that rely on duplicate key errors call this first, so uniqueness
+    holds even when ensure-indexes was never run. Returns False when the
+    indexes cannot be built (e.g. existing duplicates); callers then check
+    for duplicates before inserting.
+    """
+    return _declared_ready(db, collection_name, "unique", lambda spec: spec.get("unique"))
+
+def text_index_ready(db, collection_name):
+    """Build a collection's declared text index once per process; False if it cannot be built"""
+    return _declared_ready(db, collection_name, "text", lambda spec: TEXT in spec["key"].values())
+
+def ensure_indexes(db):
+    """Create every declared index; existing identical indexes are left untouched"""
+    created = {}
+    for collection_name, indexes in INDEXES.items():
+        created[collection_name] = db[collection_name].create_indexes(indexes)
+    return created
+
+def query_shapes():
+    """Representative (name, collection, filter, sort) for each route's queries"""
+    sample_user = ObjectId()
+    sample_item = "sample-item"
+    sample_cursor = encode_cursor({"created_at": datetime.utcnow(), "_id": ObjectId()})
+    
+    return [
+        ("create_rating upsert match", "ratings", {"user_id": sample_user, "item_id": sample_item}, None),
+        ("get_ratings by item", "ratings", {"item_id": sample_item}, SORT_ORDER),
+        ("get_ratings by user", "ratings", {"user_id": sample_user}, SORT_ORDER),
+        ("get_ratings unfiltered", "ratings", {}, SORT_ORDER),
+        ("get_ratings by item after cursor", "ratings", keyset_filter({"item_id": sample_item}, sample_cursor), SORT_ORDER),
+        ("get_comments by item", "comments", {"item_id": sample_item}, SORT_ORDER),
+        ("get_comments by user", "comments", {"user_id": sample_user}, SORT_ORDER),
+        ("get_comments unfiltered", "comments", {}, SORT_ORDER),
+        ("get_comments by item after cursor", "comments", keyset_filter({"item_id": sample_item}, sample_cursor), SORT_ORDER),
+        ("export_ratings since", "ratings", {"created_at": {"$gte": datetime.utcnow()}}, [("created_at", 1), ("_id", 1)]),
+        ("export_comments since", "comments", {"created_at": {"$gte": datetime.utcnow()}}, [("created_at", 1), ("_id", 1)]),
+        ("top items by bayes", "rating_stats", {"count": {"$gte": 1}}, [("bayes_score", -1), ("_id", 1)]),
+        ("top items by wilson", "rating_stats", {"count": {"$gte": 1}}, [("wilson_score", -1), ("_id", 1)]),
+        ("top items in window", "rating_rollups", {"granularity": "day", "bucket": {"$gte": datetime.utcnow()}}, None),
+        ("item trend", "rating_rollups", {"item_id": sample_item, "granularity": "day", "bucket": {"$gte": datetime.utcnow()}}, [("bucket", 1)]),
+        ("deletion job ratings batch", "ratings", {"user_id": sample_user, "_id": {"$gt": ObjectId()}}, [("_id", 1)]),
+        ("deletion job comments batch", "comments", {"user_id": sample_user, "_id": {"$gt": ObjectId()}}, [("_id", 1)]),
+        ("login by email", "users", {"email": "sample@example.com"}, None),
+        ("get_all_users", "users", {}, SORT_ORDER)
+    ]
+
+def _plan_stages(plan):
+    """Collect every stage name in an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+def verify_query_plans(db):
+    """Explain each route's query shape and report those that fall back to a COLLSCAN"""
+    failures = []
+    for name, collection_name, query, sort in query_shapes():
+        cursor = db[collection_name].find(query).limit(10)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        if 'COLLSCAN' in _plan_stages(winning_plan):
+            failures.append(name)
+    return failures
\ No newline at end of file
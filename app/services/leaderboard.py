@@ -0,0 +1,64 @@
+import re
+from datetime import datetime, timedelta
+from app.services.rating_stats import format_stats
+from app.services.scoring import SCORE_FIELDS, score_expressions
+from app.services.trends import bucket_start
+
+WINDOW_UNITS = {"h": "hours", "d": "days", "w": "weeks"}
+
+# Windows shorter than this are summed from hourly buckets, longer ones from daily
+HOURLY_WINDOW_LIMIT = timedelta(days=7)
+
+def parse_window(window):
+    """Parse a window such as 24h, 30d or 4w into a timedelta"""
+    match = re.fullmatch(r"(\d+)([hdw])", window or "")
+    if not match or int(match.group(1)) == 0:
+        raise ValueError("window must look like 24h, 30d or 4w")
+    return timedelta(**{WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+
+def _entry(doc, score_field):
+    summary = format_stats(doc['_id'], doc)
+    return {
+        "item_id": summary['item_id'],
+        "score": doc.get(score_field),
+        "count": summary['count'],
+        "mean": summary['mean']
+    }
+
+def top_items(db, by='bayes', limit=10, min_count=1, window=None):
+    """Highest-ranked items by Bayesian average or Wilson lower bound
+    
+    All-time rankings walk the score index on rating_stats, so the cost is
+    proportional to the number of items returned. Windowed rankings sum the
+    trend rollups instead of raw ratings: one bucket per item and hour (or
+    day) in the window, which is proportional to the active items, not to
+    the ratings they received.
+    """
+    if by not in SCORE_FIELDS:
+        raise ValueError("by must be one of: bayes, wilson")
+    score_field = SCORE_FIELDS[by]
+    
+    if window:
+        span = parse_window(window)
+        granularity = 'hour' if span < HOURLY_WINDOW_LIMIT else 'day'
+        since = bucket_start(datetime.utcnow() - span, granularity)
+        pipeline = [
+            {"$match": {"granularity": granularity, "bucket": {"$gte": since}}},
+            {"$group": {
+                "_id": "$item_id",
+                "count": {"$sum": "$count"},
+                "sum": {"$sum": "$sum"},
+                "sum_sq": {"$sum": "$sum_sq"}
+            }},
+            {"$match": {"count": {"$gte": max(min_count, 1)}}},
+            {"$set": score_expressions()},
+            {"$sort": {score_field: -1, "_id": 1}},
+            {"$limit": limit}
+        ]
+        docs = db.rating_rollups.aggregate(pipeline, allowDiskUse=True)
+    else:
+        docs = db.rating_stats.find(
+            {"count": {"$gte": min_count}}
+        ).sort([(score_field, -1), ("_id", 1)]).limit(limit)
+    
+    return [_entry(doc, score_field) for doc in docs]
\ No newline at end of file
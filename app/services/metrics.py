@@ -0,0 +1,232 @@
+import logging
+import threading
+import time
+from flask import g, request
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+REQUEST_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+COMMAND_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+
+class Histogram:
+    """Thread-safe labelled histogram with cumulative buckets, Prometheus style"""
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+    
+    def observe(self, labels, seconds):
+        with self._lock:
+            entry = self._series.get(labels)
+            if entry is None:
+                entry = self._series[labels] = {"count": 0, "sum": 0.0, "buckets": [0] * len(self.buckets)}
+            entry["count"] += 1
+            entry["sum"] += seconds
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][position] += 1
+    
+    def snapshot(self):
+        with self._lock:
+            return {labels: dict(entry, buckets=list(entry["buckets"])) for labels, entry in self._series.items()}
+
+class Counter:
+    """Thread-safe labelled counter"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+    
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+    
+    def snapshot(self):
+        with self._lock:
+            return dict(self._series)
+
+# Keyed by (blueprint, route, method) and (blueprint, route, method, status)
+request_latency = Histogram(REQUEST_BUCKETS)
+request_status = Counter()
+
+# Keyed by (collection, command)
+command_latency = Histogram(COMMAND_BUCKETS)
+command_documents = Counter()
+command_failures = Counter()
+
+def _command_collection(command_name, command):
+    """Collection a command targets; getMore names it in a separate field"""
+    if command_name == "getMore":
+        return command.get("collection", "")
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+def awaits_data(event):
+    """True for getMore on a tailable awaitData cursor (change streams)
+    
+    These block server-side for up to maxTimeMS while idle, so their
+    duration measures waiting, not database latency.
+    """
+    return event.command_name == "getMore" and "maxTimeMS" in event.command
+
+def _returned_documents(reply):
+    """Documents in a reply's cursor batch (find, aggregate, getMore)"""
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    return 0
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records per-collection command durations and logs slow commands
+    
+    Passed to PyMongo (and Motor) via event_listeners. Commands slower than
+    slow_query_ms are logged with their collection and duration.
+    """
+    
+    def __init__(self, slow_query_ms=100):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._pending = {}
+    
+    def started(self, event):
+        key = (event.connection_id, event.request_id)
+        collection = None if awaits_data(event) else _command_collection(event.command_name, event.command)
+        with self._lock:
+            self._pending[key] = collection
+    
+    def _finish(self, event):
+        with self._lock:
+            collection = self._pending.pop((event.connection_id, event.request_id), "")
+        if collection is None:
+            return None
+        labels = (collection, event.command_name)
+        seconds = event.duration_micros / 1e6
+        command_latency.observe(labels, seconds)
+        if self.slow_query_ms and seconds * 1000 >= self.slow_query_ms:
+            logger.warning(
+                "Slow MongoDB command %s on %s.%s took %.1f ms",
+                event.command_name, event.database_name, collection, seconds * 1000
+            )
+        return labels
+    
+    def succeeded(self, event):
+        labels = self._finish(event)
+        returned = _returned_documents(event.reply)
+        if labels and returned:
+            command_documents.inc(labels, returned)
+    
+    def failed(self, event):
+        labels = self._finish(event)
+        if labels:
+            command_failures.inc(labels)
+
+command_listener = CommandMetrics()
+
+def init_metrics(app):
+    """Time every request by blueprint and route template"""
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # Route templates, not raw paths, keep label cardinality bounded
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            labels = (request.blueprint or "", route, request.method)
+            request_latency.observe(labels, time.perf_counter() - started)
+            request_status.inc(labels + (str(response.status_code),))
+        return response
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+def _histogram_lines(name, help_text, names, series, buckets):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for values, entry in sorted(series.items()):
+        labels = _labels(names, values)
+        prefix = labels + "," if labels else ""
+        for bound, count in zip(buckets, entry["buckets"]):
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {entry["count"]}')
+        lines.append(f"{name}_sum{{{labels}}} {entry['sum']}")
+        lines.append(f"{name}_count{{{labels}}} {entry['count']}")
+    return lines
+
+def _counter_lines(name, help_text, names, series, metric_type="counter"):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for values, value in sorted(series.items()):
+        labels = _labels(names, values)
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+    return lines
+
+def render_metrics(cache=None, hashing=None, write_behind=None, rate_limit=None):
+    """Prometheus text exposition of request, MongoDB and service metrics
+    
+    `cache`, `hashing`, `write_behind` and `rate_limit` are the dicts
+    returned by the existing stats endpoints and are folded in when given.
+    """
+    lines = []
+    lines += _histogram_lines(
+        "http_request_duration_seconds", "Request latency by route",
+        ("blueprint", "route", "method"), request_latency.snapshot(), REQUEST_BUCKETS
+    )
+    lines += _counter_lines(
+        "http_requests_total", "Responses by route and status",
+        ("blueprint", "route", "method", "status"), request_status.snapshot()
+    )
+    lines += _histogram_lines(
+        "mongodb_command_duration_seconds", "MongoDB command latency by collection",
+        ("collection", "command"), command_latency.snapshot(), COMMAND_BUCKETS
+    )
+    lines += _counter_lines(
+        "mongodb_command_documents_returned_total", "Documents returned by MongoDB commands",
+        ("collection", "command"), command_documents.snapshot()
+    )
+    lines += _counter_lines(
+        "mongodb_command_failures_total", "Failed MongoDB commands",
+        ("collection", "command"), command_failures.snapshot()
+    )
+    
+    if cache:
+        for field in ("hits", "misses", "evictions", "expirations"):
+            lines += _counter_lines(
+                f"cache_{field}_total", f"In-process cache {field}",
+                ("cache",), {(name,): stats[field] for name, stats in cache.items() if field in stats}
+            )
+        lines += _counter_lines(
+            "cache_size", "In-process cache entries",
+            ("cache",), {(name,): stats["size"] for name, stats in cache.items() if "size" in stats}, "gauge"
+        )
+    
+    if hashing:
+        lines += _histogram_lines(
+            "password_hash_duration_seconds", "Password hashing latency by operation",
+            ("operation",), {(name,): entry for name, entry in hashing["operations"].items()}, hashing["buckets"]
+        )
+        lines += _counter_lines(
+            "password_hash_rejected_total", "Hashing requests rejected while saturated",
+            ("operation",), {(name,): entry["rejected"] for name, entry in hashing["operations"].items()}
+        )
+    
+    if write_behind:
+        gauges = {"depth", "spill_bytes"}
+        for field, value in sorted(write_behind.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"write_behind_{field}" if field in gauges else f"write_behind_{field}_total"
+            lines += _counter_lines(name, f"Write-behind {field}", (), {(): value}, "gauge" if field in gauges else "counter")
+    
+    if rate_limit:
+        for field in ("allowed", "limited", "shed", "backend_errors"):
+            lines += _counter_lines(f"rate_limit_{field}_total", f"Requests {field.replace('_', ' ')} by the rate limiter", (), {(): rate_limit[field]})
+        lines += _counter_lines("http_requests_in_flight", "Requests currently being served", (), {(): rate_limit["in_flight"]}, "gauge")
+        lines += _counter_lines("mongodb_command_latency_ewma_ms", "Moving average of MongoDB command latency", (), {(): rate_limit["db_latency_ewma_ms"]}, "gauge")
+    
+    return "\n".join(lines) + "\n"
\ No newline at end of file
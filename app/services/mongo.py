@@ -0,0 +1,42 @@
+import threading
+from flask_pymongo import PyMongo
+from flask_pymongo.helpers import BSONObjectIdConverter, BSONProvider
+
+class LazyMongo:
+    """Drop-in for PyMongo(app) that builds the client on first use
+    
+    Importing the app no longer parses the URI (a DNS lookup for
+    mongodb+srv) or constructs the client. The client is then kept for the
+    life of the process, so warm serverless invocations reuse its pooled
+    connections.
+    """
+    
+    def __init__(self, app, **client_kwargs):
+        self._app = app
+        self._client_kwargs = client_kwargs
+        self._mongo = None
+        self._lock = threading.Lock()
+        
+        # Registered up front so routes and jsonify behave as with PyMongo(app)
+        app.url_map.converters["ObjectId"] = BSONObjectIdConverter
+        app.json = BSONProvider(app)
+    
+    def _get(self):
+        if self._mongo is None:
+            with self._lock:
+                if self._mongo is None:
+                    self._mongo = PyMongo(self._app, **self._client_kwargs)
+        return self._mongo
+    
+    @property
+    def connected(self):
+        """Whether the client has been created yet"""
+        return self._mongo is not None
+    
+    @property
+    def cx(self):
+        return self._get().cx
+    
+    @property
+    def db(self):
+        return self._get().db
\ No newline at end of file
@@ -0,0 +1,135 @@
+import asyncio
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.services.projection import strip_fields, with_required
+
+# Listings are ordered newest first; _id breaks ties between equal timestamps
+SORT_ORDER = [("created_at", -1), ("_id", -1)]
+TOTAL_MODES = ("exact", "estimate", "none")
+
+def encode_token(payload):
+    """Serialize a position into an opaque URL-safe token"""
+    data = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+def decode_token(token):
+    """Parse a token built by encode_token"""
+    padded = token + '=' * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+def encode_cursor(doc):
+    """Build an opaque cursor pointing just past the given document"""
+    return encode_token({"t": doc['created_at'].isoformat(), "id": str(doc['_id'])})
+
+def decode_cursor(cursor):
+    """Parse a cursor back into its (created_at, _id) position"""
+    try:
+        payload = decode_token(cursor)
+        return datetime.fromisoformat(payload['t']), ObjectId(payload['id'])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError("Invalid cursor")
+
+def keyset_filter(query, cursor):
+    """Restrict a query to documents that sort after the cursor position"""
+    created_at, object_id = decode_cursor(cursor)
+    after = {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": object_id}}
+    ]}
+    return {"$and": [query, after]} if query else after
+
+def parse_page_args(args):
+    """Validate listing query params into (per_page, page, cursor, total_mode)"""
+    per_page = int(args.get('per_page', 10))
+    if per_page < 1:
+        raise ValueError("per_page must be positive")
+    
+    cursor = args.get('cursor')
+    total_mode = args.get('total', 'none' if cursor else 'exact')
+    if total_mode not in TOTAL_MODES:
+        raise ValueError("total must be one of: exact, estimate, none")
+    
+    page = None
+    if not cursor:
+        page = int(args.get('page', 1))
+        if page < 1:
+            raise ValueError("page must be positive")
+    
+    return per_page, page, cursor, total_mode
+
+def page_find_args(query, per_page, page, cursor):
+    """Filter and skip for one page; one extra document is fetched to detect more pages"""
+    if cursor:
+        return keyset_filter(query, cursor), 0
+    return query, (page - 1) * per_page
+
+def page_meta(docs, total, per_page, page, cursor):
+    """Trim the extra document and build the pagination fields for the response"""
+    has_more = len(docs) > per_page
+    docs = docs[:per_page]
+    
+    meta = {"per_page": per_page}
+    if not cursor:
+        meta['page'] = page
+    meta['next_cursor'] = encode_cursor(docs[-1]) if has_more else None
+    meta['total'] = total
+    if total is not None and not cursor:
+        meta['total_pages'] = (total + per_page - 1) // per_page
+    
+    return docs, meta
+
+def paginate(collection, query, args, estimate=None, projection=None):
+    """Fetch one page of a listing using either a cursor or page number
+    
+    Returns the documents and the pagination fields for the response.
+    `estimate` is an optional callable returning an approximate count
+    for filtered queries when the caller asks for total=estimate.
+    `projection` limits the returned fields; created_at is still fetched
+    for the next cursor and stripped afterwards if it was not selected.
+    """
+    per_page, page, cursor, total_mode = parse_page_args(args)
+    find_query, skip = page_find_args(query, per_page, page, cursor)
+    fetch, internal = with_required(projection, ["created_at"])
+    docs = list(collection.find(find_query, fetch).sort(SORT_ORDER).skip(skip).limit(per_page + 1))
+    
+    # Get total count only when requested
+    total = None
+    if total_mode == 'exact':
+        total = collection.count_documents(query)
+    elif total_mode == 'estimate':
+        if not query:
+            total = collection.estimated_document_count()
+        elif estimate:
+            total = estimate(query)
+    
+    docs, meta = page_meta(docs, total, per_page, page, cursor)
+    strip_fields(docs, internal)
+    return docs, meta
+
+async def paginate_async(collection, query, args, estimate=None, projection=None):
+    """Motor variant of paginate; the page fetch and the count run concurrently
+    
+    `estimate` is an optional coroutine function.
+    """
+    per_page, page, cursor, total_mode = parse_page_args(args)
+    find_query, skip = page_find_args(query, per_page, page, cursor)
+    fetch, internal = with_required(projection, ["created_at"])
+    find = collection.find(find_query, fetch).sort(SORT_ORDER).skip(skip).limit(per_page + 1)
+    
+    async def count():
+        if total_mode == 'exact':
+            return await collection.count_documents(query)
+        if total_mode == 'estimate':
+            if not query:
+                return await collection.estimated_document_count()
+            if estimate:
+                return await estimate(query)
+        return None
+    
+    docs, total = await asyncio.gather(find.to_list(length=per_page + 1), count())
+    docs, meta = page_meta(docs, total, per_page, page, cursor)
+    strip_fields(docs, internal)
+    return docs, meta
\ No newline at end of file
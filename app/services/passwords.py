@@ -0,0 +1,115 @@
+import threading
+import time
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+LATENCY_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool and its queue are full"""
+
+class _HashPool:
+    """Bounded process pool for password hashing and verification"""
+    
+    def __init__(self, workers, queue_limit):
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._executor = None
+        if workers > 0:
+            try:
+                # Imported here so cold starts that never hash skip multiprocessing
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                
+                # Spawn, not fork: forking while MongoDB monitor and worker
+                # threads hold locks can deadlock the children
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            except (OSError, NotImplementedError):
+                # Some serverless runtimes cannot create process pools;
+                # hash inline but keep the same concurrency limit
+                self._executor = None
+    
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("Password hashing is saturated, retry shortly")
+        try:
+            if self._executor is None:
+                return fn(*args)
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+_pool = None
+_pool_lock = threading.Lock()
+_method_prefix = {}
+_stats_lock = threading.Lock()
+_stats = {}
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _HashPool(
+                    workers=current_app.config.get("PASSWORD_HASH_WORKERS", 2),
+                    queue_limit=current_app.config.get("PASSWORD_HASH_QUEUE_LIMIT", 16)
+                )
+    return _pool
+
+def _record(operation, seconds=None, rejected=False):
+    """Track latency per operation in cumulative buckets"""
+    with _stats_lock:
+        entry = _stats.setdefault(operation, {
+            "count": 0,
+            "sum": 0.0,
+            "max": 0.0,
+            "rejected": 0,
+            "buckets": [0] * len(LATENCY_BUCKETS)
+        })
+        if rejected:
+            entry["rejected"] += 1
+            return
+        entry["count"] += 1
+        entry["sum"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        for position, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                entry["buckets"][position] += 1
+
+def _run(operation, fn, *args):
+    started = time.perf_counter()
+    try:
+        result = _get_pool().run(fn, *args)
+    except HashingBusy:
+        _record(operation, rejected=True)
+        raise
+    _record(operation, time.perf_counter() - started)
+    return result
+
+def hash_method():
+    return current_app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+
+def hash_password(password):
+    """Hash a password on the pool with the configured algorithm and cost"""
+    return _run("hash", generate_password_hash, password, hash_method())
+
+def verify_password(password_hash, password):
+    """Check a password against its stored hash on the pool"""
+    return _run("verify", check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with different algorithm or cost parameters"""
+    method = hash_method()
+    if method not in _method_prefix:
+        # werkzeug fills in default cost parameters, so derive the full prefix once
+        _method_prefix[method] = generate_password_hash("", method).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _method_prefix[method]
+
+def hash_stats():
+    with _stats_lock:
+        return {
+            "buckets": LATENCY_BUCKETS,
+            "operations": {operation: dict(entry, buckets=list(entry["buckets"])) for operation, entry in _stats.items()}
+        }
\ No newline at end of file
@@ -0,0 +1,90 @@
+# Fields clients may select with ?fields=; _id is always returned and the
+# password hash is never selectable
+FIELDS = {
+    "ratings": ("user_id", "item_id", "rating", "description", "created_at", "updated_at", "anonymized"),
+    "comments": ("user_id", "item_id", "content", "created_at", "updated_at", "anonymized"),
+    "users": ("email", "name", "created_at")
+}
+EXPANSIONS = ("user",)
+
+# Fields excluded at the query level when no fields= param is given
+HIDDEN_FIELDS = {
+    "users": {"password": 0}
+}
+
+def parse_fields(args, collection):
+    """Map a comma separated fields= param to a MongoDB projection"""
+    raw = args.get('fields')
+    if not raw:
+        return HIDDEN_FIELDS.get(collection)
+    
+    requested = [field.strip() for field in raw.split(',') if field.strip()]
+    fields = [field for field in requested if field != '_id']
+    unknown = [field for field in fields if field not in FIELDS[collection]]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(FIELDS[collection])}")
+    
+    # PyMongo drops an empty projection, which would return every field
+    if not fields:
+        return {"_id": 1} if requested else HIDDEN_FIELDS.get(collection)
+    
+    return check_hidden({field: 1 for field in fields}, collection)
+
+def check_hidden(projection, collection):
+    """Refuse a projection that could return a hidden field"""
+    hidden = HIDDEN_FIELDS.get(collection, {})
+    if hidden and not projection:
+        raise ValueError(f"A projection is required for {collection}")
+    for field in hidden:
+        if field in projection and projection[field] != 0:
+            raise ValueError(f"Field cannot be selected: {field}")
+        if field not in projection and 0 in projection.values():
+            raise ValueError(f"Projection for {collection} must exclude {field}")
+    return projection
+
+def parse_expand(args):
+    """Validate the comma separated expand= param into a set of expansions"""
+    expand = {name.strip() for name in args.get('expand', '').split(',') if name.strip()}
+    unknown = expand - set(EXPANSIONS)
+    if unknown:
+        raise ValueError(f"expand must be one of: {', '.join(EXPANSIONS)}")
+    return expand
+
+def with_required(projection, required):
+    """Extend an inclusion projection with fields the server needs internally
+    
+    Returns the projection to query with and the fields that were added,
+    which the caller strips before responding.
+    """
+    if not projection or 0 in projection.values():
+        return projection, []
+    added = [field for field in required if field not in projection]
+    return {**projection, **{field: 1 for field in added}}, added
+
+def strip_fields(docs, fields):
+    """Remove fields that were only fetched for internal use"""
+    for doc in docs:
+        for field in fields:
+            doc.pop(field, None)
+
+def _author_ids(docs):
+    return list({doc['user_id'] for doc in docs if doc.get('user_id')})
+
+def _attach_users(docs, users):
+    """Set doc['user'] to the author's id and name, or None for deleted users"""
+    names = {user['_id']: user.get('name') for user in users}
+    for doc in docs:
+        user_id = doc.get('user_id')
+        doc['user'] = {"id": str(user_id), "name": names[user_id]} if user_id in names else None
+
+def expand_users(db, docs):
+    """Join author names onto a page of documents with one $in lookup"""
+    ids = _author_ids(docs)
+    users = db.users.find({"_id": {"$in": ids}}, {"name": 1}) if ids else []
+    _attach_users(docs, users)
+
+async def expand_users_async(db, docs):
+    """Motor variant of expand_users"""
+    ids = _author_ids(docs)
+    users = await db.users.find({"_id": {"$in": ids}}, {"name": 1}).to_list(length=None) if ids else []
+    _attach_users(docs, users)
\ No newline at end of file
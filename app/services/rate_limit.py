@@ -0,0 +1,292 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from flask import current_app, g, jsonify, request
+from pymongo import monitoring
+from app.services.auth import AuthError, get_token_claims
+from app.services.cache import TTLCache
+from app.services.metrics import awaits_data
+
+logger = logging.getLogger(__name__)
+
+# (burst, tokens per second) by Flask endpoint; other routes use the configured default
+ROUTE_BUDGETS = {
+    "user_routes.login": (10, 10 / 60),
+    "user_routes.register": (5, 5 / 60),
+    "comment_routes.create_comment": (30, 1.0),
+    "rating_routes.create_rating": (30, 1.0),
+    "rating_routes.upsert_my_rating": (30, 1.0),
+    "rating_routes.create_ratings_bulk": (5, 5 / 60),
+    "rating_routes.export_ratings": (5, 5 / 60),
+    "comment_routes.export_comments": (5, 5 / 60),
+    "rating_routes.stream_item_events": (10, 0.5)
+}
+
+# Health and monitoring routes are never limited or shed
+EXEMPT_ENDPOINTS = {
+    "home",
+    "get_metrics",
+    "get_cache_stats",
+    "get_hashing_stats",
+    "get_write_behind_stats",
+    "get_rate_limit_stats",
+    "get_events_stats",
+    "static"
+}
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+class MemoryBuckets:
+    """Per-process token buckets"""
+    
+    def __init__(self, maxsize=100000):
+        self._buckets = TTLCache(maxsize=maxsize, ttl=3600)
+        self._lock = threading.Lock()
+    
+    def take(self, key, capacity, rate, cost=1):
+        """Spend tokens from a bucket; returns (allowed, tokens left)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            # A bucket refilled to capacity is the same as a missing one
+            self._buckets.set(key, (tokens, now), ttl=capacity / rate + 1)
+        return allowed, tokens
+    
+    def stats(self):
+        return {"backend": "memory", **self._buckets.stats()}
+
+# Refill and spend atomically on the server so all processes share one bucket
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisBuckets:
+    """Token buckets shared between processes through a Redis-compatible server"""
+    
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+    
+    def take(self, key, capacity, rate, cost=1):
+        allowed, tokens = self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate, time.time(), cost])
+        return bool(allowed), float(tokens)
+    
+    def stats(self):
+        return {"backend": "redis"}
+
+class LoadShedder(monitoring.CommandListener):
+    """Tracks in-flight requests and recent MongoDB latency
+    
+    Registered as a PyMongo event listener so command durations feed an
+    exponentially weighted moving average. The average also decays with
+    time since the last command: shed writes never reach MongoDB, so
+    without decay a few slow commands could keep shedding writes forever.
+    """
+    
+    def __init__(self, max_in_flight=100, db_latency_ms=1000, smoothing=0.2, decay_seconds=5.0):
+        self.max_in_flight = max_in_flight
+        self.db_latency_ms = db_latency_ms
+        self.smoothing = smoothing
+        self.decay_seconds = decay_seconds
+        self.in_flight = 0
+        self._ewma_ms = 0.0
+        self._last_sample = time.monotonic()
+        self._lock = threading.Lock()
+        self._awaiting = set()
+    
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            return self.in_flight
+    
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+    
+    def _decayed(self, now):
+        return self._ewma_ms * math.exp(-(now - self._last_sample) / self.decay_seconds)
+    
+    @property
+    def db_latency_ewma_ms(self):
+        """Average MongoDB latency, decayed toward zero while no commands complete"""
+        with self._lock:
+            return self._decayed(time.monotonic())
+    
+    def _observe(self, event):
+        milliseconds = event.duration_micros / 1000
+        with self._lock:
+            # Change stream getMores wait on purpose; they are not latency
+            if self._awaiting:
+                key = (event.connection_id, event.request_id)
+                if key in self._awaiting:
+                    self._awaiting.discard(key)
+                    return
+            now = time.monotonic()
+            ewma = self._decayed(now)
+            self._ewma_ms = ewma + self.smoothing * (milliseconds - ewma)
+            self._last_sample = now
+    
+    def started(self, event):
+        if awaits_data(event):
+            with self._lock:
+                self._awaiting.add((event.connection_id, event.request_id))
+    
+    def succeeded(self, event):
+        self._observe(event)
+    
+    def failed(self, event):
+        self._observe(event)
+    
+    def should_shed(self, in_flight, method):
+        """Reason to reject a request, or None
+        
+        Too many requests in flight sheds everything; slow MongoDB sheds
+        only writes so reads keep their latency.
+        """
+        if self.max_in_flight and in_flight > self.max_in_flight:
+            return "Server is overloaded, retry shortly"
+        if self.db_latency_ms and method not in READ_METHODS and self.db_latency_ewma_ms > self.db_latency_ms:
+            return "Database is overloaded, retry shortly"
+        return None
+
+load_shedder = LoadShedder()
+
+_buckets = None
+_buckets_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"allowed": 0, "limited": 0, "shed": 0, "backend_errors": 0}
+
+def get_buckets():
+    """Create the configured bucket backend on first use"""
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                url = current_app.config.get("RATE_LIMIT_URL", "memory://")
+                _buckets = MemoryBuckets() if url.startswith("memory://") else RedisBuckets(url)
+    return _buckets
+
+def _count(counter):
+    with _stats_lock:
+        _stats[counter] += 1
+
+_api_key_hashes = None
+
+def known_api_key(api_key):
+    """True when the key is one of the configured RATE_LIMIT_API_KEYS"""
+    global _api_key_hashes
+    if _api_key_hashes is None:
+        configured = current_app.config.get("RATE_LIMIT_API_KEYS", "")
+        _api_key_hashes = {
+            hashlib.sha256(key.strip().encode()).hexdigest()
+            for key in configured.split(',') if key.strip()
+        }
+    return hashlib.sha256(api_key.encode()).hexdigest() in _api_key_hashes
+
+def caller_key():
+    """Identify the caller by JWT user id, then a known API key, then client IP
+    
+    Unknown API keys are ignored; otherwise a fresh key per request would
+    get a fresh bucket and bypass every budget.
+    """
+    if request.headers.get('Authorization', '').startswith('Bearer '):
+        try:
+            return f"user:{get_token_claims()['user_id']}"
+        except (AuthError, KeyError):
+            pass
+    
+    api_key = request.headers.get('X-API-Key')
+    if api_key and known_api_key(api_key):
+        return f"key:{hashlib.sha1(api_key.encode()).hexdigest()[:16]}"
+    
+    if current_app.config.get("RATE_LIMIT_TRUST_FORWARDED") and request.access_route:
+        return f"ip:{request.access_route[0]}"
+    return f"ip:{request.remote_addr}"
+
+def route_budget(endpoint):
+    return ROUTE_BUDGETS.get(endpoint) or (
+        current_app.config.get("RATE_LIMIT_DEFAULT_BURST", 120),
+        current_app.config.get("RATE_LIMIT_DEFAULT_RATE", 20)
+    )
+
+def _reject(status, message, retry_after, headers=None):
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    response.headers.extend(headers or {})
+    return response
+
+def init_rate_limiting(app):
+    """Shed load and enforce per-caller, per-route token buckets before each request"""
+    load_shedder.max_in_flight = app.config.get("SHED_MAX_IN_FLIGHT", 100)
+    load_shedder.db_latency_ms = app.config.get("SHED_DB_LATENCY_MS", 1000)
+    
+    @app.before_request
+    def limit_request():
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in EXEMPT_ENDPOINTS or request.method == "OPTIONS":
+            return None
+        
+        g.counted_in_flight = True
+        reason = load_shedder.should_shed(load_shedder.enter(), request.method)
+        if reason:
+            _count("shed")
+            return _reject(503, reason, 1)
+        
+        if not app.config.get("RATE_LIMIT_ENABLED", True):
+            return None
+        
+        capacity, rate = route_budget(endpoint)
+        try:
+            allowed, tokens = get_buckets().take(f"{caller_key()}:{endpoint}", capacity, rate)
+        except Exception:
+            # A shared backend outage must not take the API down with it
+            _count("backend_errors")
+            logger.exception("Rate limit backend failed, allowing request")
+            return None
+        
+        if allowed:
+            _count("allowed")
+            return None
+        _count("limited")
+        return _reject(429, "Rate limit exceeded", (1 - tokens) / rate, {
+            "X-RateLimit-Limit": str(capacity),
+            "X-RateLimit-Remaining": "0"
+        })
+    
+    @app.teardown_request
+    def release_request(exc):
+        if g.pop('counted_in_flight', False):
+            load_shedder.leave()
+
+def rate_limit_stats():
+    with _stats_lock:
+        counters = dict(_stats)
+    return {
+        **counters,
+        "in_flight": load_shedder.in_flight,
+        "db_latency_ewma_ms": round(load_shedder.db_latency_ewma_ms, 2),
+        "buckets": _buckets.stats() if _buckets else None
+    }
\ No newline at end of file
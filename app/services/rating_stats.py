@@ -0,0 +1,160 @@
+from datetime import datetime
+from pymongo import UpdateOne
+from app.services.scoring import score_expressions
+from app.services.trends import add_rollup_delta, apply_rollup_deltas
+
+STAR_LEVELS = ["1", "2", "3", "4", "5"]
+
+def star_bucket(value):
+    """Map a rating value to its 1-5 histogram bucket"""
+    return str(min(5, max(1, int(round(value)))))
+
+def rating_delta(value, sign=1):
+    """Build the $inc fields that add (sign=1) or remove (sign=-1) one rating"""
+    return {
+        "count": sign,
+        "sum": sign * value,
+        "sum_sq": sign * value * value,
+        f"histogram.{star_bucket(value)}": sign
+    }
+
+def merge_deltas(target, delta):
+    """Accumulate one $inc document into another"""
+    for field, amount in delta.items():
+        target[field] = target.get(field, 0) + amount
+    return target
+
+def apply_rating_change(db, item_id, old_value=None, new_value=None, created_at=None):
+    """Move an item's aggregates from old_value to new_value in a single update
+    
+    created_at is the rating's creation time and selects its trend buckets.
+    """
+    inc = {}
+    if old_value is not None:
+        merge_deltas(inc, rating_delta(old_value, -1))
+    if new_value is not None:
+        merge_deltas(inc, rating_delta(new_value, 1))
+    
+    rollups = {}
+    if created_at is not None:
+        add_rollup_delta(rollups, item_id, created_at, inc)
+    apply_rating_deltas(db, {item_id: inc}, rollups)
+
+def stats_update(inc, now):
+    """Pipeline update applying $inc-style deltas and refreshing the ranking scores
+    
+    Running both stages in one update keeps the scores consistent with the
+    counters without a second round trip.
+    """
+    fields = {
+        field: {"$add": [{"$ifNull": [f"${field}", 0]}, amount]}
+        for field, amount in inc.items()
+    }
+    fields["updated_at"] = now
+    return [{"$set": fields}, {"$set": score_expressions()}]
+
+def apply_rating_deltas(db, deltas, rollups=None):
+    """Apply accumulated $inc documents for many items in one bulk write
+    
+    rollups holds matching trend bucket deltas built with add_rollup_delta.
+    """
+    now = datetime.utcnow()
+    operations = []
+    for item_id, inc in deltas.items():
+        # Drop fields that cancel out (e.g. an update within the same bucket)
+        inc = {field: amount for field, amount in inc.items() if amount != 0}
+        if inc:
+            operations.append(UpdateOne({"_id": item_id}, stats_update(inc, now), upsert=True))
+    
+    if operations:
+        db.rating_stats.bulk_write(operations, ordered=False)
+    if rollups:
+        apply_rollup_deltas(db, rollups)
+
+def format_stats(item_id, stats):
+    """Convert a rating_stats document to the public response shape"""
+    stats = stats or {}
+    count = stats.get('count', 0)
+    total = stats.get('sum', 0)
+    sum_sq = stats.get('sum_sq', 0)
+    histogram = stats.get('histogram', {})
+    
+    mean = total / count if count > 0 else None
+    stddev = None
+    if count > 0:
+        variance = max(sum_sq / count - mean * mean, 0)
+        stddev = variance ** 0.5
+    
+    return {
+        "item_id": item_id,
+        "count": count,
+        "sum": total,
+        "mean": mean,
+        "stddev": stddev,
+        "histogram": {level: histogram.get(level, 0) for level in STAR_LEVELS}
+    }
+
+def stats_pipeline():
+    """Aggregation stages that group ratings into rating_stats-shaped documents"""
+    bucket = {"$min": [5, {"$max": [1, {"$round": ["$rating", 0]}]}]}
+    group = {
+        "_id": "$item_id",
+        "count": {"$sum": 1},
+        "sum": {"$sum": "$rating"},
+        "sum_sq": {"$sum": {"$multiply": ["$rating", "$rating"]}}
+    }
+    for level in STAR_LEVELS:
+        group[f"h{level}"] = {"$sum": {"$cond": [{"$eq": [bucket, int(level)]}, 1, 0]}}
+    
+    return [
+        {"$group": group},
+        {"$project": {
+            "count": 1,
+            "sum": 1,
+            "sum_sq": 1,
+            "histogram": {level: f"$h{level}" for level in STAR_LEVELS},
+            "updated_at": "$$NOW"
+        }},
+        {"$set": score_expressions()}
+    ]
+
+def rebuild_rating_stats(db):
+    """Recompute every item's aggregates from the ratings collection in one pass"""
+    pipeline = stats_pipeline() + [{"$out": "rating_stats"}]
+    db.ratings.aggregate(pipeline, allowDiskUse=True)
+    return db.rating_stats.count_documents({})
+
+def summarize_items(db, item_ids, source='stats'):
+    """Aggregates for many items in one query, in the order requested
+    
+    source='stats' reads the precomputed rating_stats documents;
+    source='ratings' groups the raw ratings with one $match/$group.
+    """
+    if source == 'ratings':
+        pipeline = [{"$match": {"item_id": {"$in": item_ids}}}] + stats_pipeline()
+        docs = db.ratings.aggregate(pipeline)
+    else:
+        docs = db.rating_stats.find({"_id": {"$in": item_ids}})
+    
+    by_item = {doc['_id']: doc for doc in docs}
+    return [format_stats(item_id, by_item.get(item_id)) for item_id in item_ids]
+
+def columnar(summaries):
+    """Lay out a list of summaries as parallel arrays"""
+    return {
+        "item_ids": [summary['item_id'] for summary in summaries],
+        "count": [summary['count'] for summary in summaries],
+        "mean": [summary['mean'] for summary in summaries],
+        "stddev": [summary['stddev'] for summary in summaries],
+        "histogram": {
+            level: [summary['histogram'][level] for summary in summaries]
+            for level in STAR_LEVELS
+        }
+    }
+
+def estimate_rating_count(db, query):
+    """Approximate a ratings count from the aggregates when filtering by item only"""
+    if set(query) != {"item_id"}:
+        return None
+    stats = db.rating_stats.find_one({"_id": query['item_id']}, {"count": 1})
+    return stats.get('count', 0) if stats else 0
\ No newline at end of file
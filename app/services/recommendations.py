@@ -0,0 +1,131 @@
+from array import array
+from datetime import datetime
+from pymongo import ReplaceOne
+from app.services.pagination import SORT_ORDER
+
+def _load_ratings(db, batch_size=10000):
+    """Stream ratings into compact integer-encoded coordinate arrays"""
+    user_index = {}
+    item_index = {}
+    rows = array('i')
+    cols = array('i')
+    values = array('f')
+    
+    cursor = db.ratings.find({}, {"user_id": 1, "item_id": 1, "rating": 1, "_id": 0}).batch_size(batch_size)
+    for doc in cursor:
+        rows.append(item_index.setdefault(doc['item_id'], len(item_index)))
+        cols.append(user_index.setdefault(doc['user_id'], len(user_index)))
+        values.append(doc['rating'])
+    
+    return list(item_index), len(user_index), rows, cols, values
+
+def build_item_neighbors(db, top_n=20, block_size=1000):
+    """Compute the top-N most similar items for every item and store them in item_neighbors
+    
+    Similarity is adjusted cosine: ratings are centred on each user's mean,
+    item vectors are L2-normalised, and the item x item product is computed
+    block_size rows at a time so memory is bounded by the block.
+    """
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError:
+        raise RuntimeError("Building recommendations requires numpy and scipy (pip install numpy scipy)")
+    
+    items, user_count, rows, cols, values = _load_ratings(db)
+    if not items:
+        return 0
+    
+    rows = np.frombuffer(rows, dtype=np.int32)
+    cols = np.frombuffer(cols, dtype=np.int32)
+    values = np.frombuffer(values, dtype=np.float32)
+    
+    # Centre each rating on its user's mean so harsh and generous raters compare fairly
+    user_sums = np.bincount(cols, weights=values, minlength=user_count)
+    user_counts = np.maximum(np.bincount(cols, minlength=user_count), 1)
+    centred = (values - (user_sums / user_counts)[cols]).astype(np.float32)
+    
+    matrix = sparse.csr_matrix((centred, (rows, cols)), shape=(len(items), user_count), dtype=np.float32)
+    matrix.eliminate_zeros()
+    
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.diags((1 / norms).astype(np.float32)).dot(matrix).tocsr()
+    transposed = matrix.T.tocsr()
+    
+    started = datetime.utcnow()
+    for start in range(0, len(items), block_size):
+        block = matrix[start:start + block_size].dot(transposed).tocsr()
+        
+        operations = []
+        for offset in range(block.shape[0]):
+            position = start + offset
+            lo, hi = block.indptr[offset], block.indptr[offset + 1]
+            neighbors = block.indices[lo:hi]
+            scores = block.data[lo:hi]
+            
+            keep = (neighbors != position) & (scores > 0)
+            neighbors, scores = neighbors[keep], scores[keep]
+            if len(scores) > top_n:
+                top = np.argpartition(-scores, top_n)[:top_n]
+                neighbors, scores = neighbors[top], scores[top]
+            order = np.argsort(-scores)
+            
+            operations.append(ReplaceOne(
+                {"_id": items[position]},
+                {
+                    "neighbors": [
+                        {"item_id": items[neighbors[i]], "score": round(float(scores[i]), 6)}
+                        for i in order
+                    ],
+                    "updated_at": started
+                },
+                upsert=True
+            ))
+        db.item_neighbors.bulk_write(operations, ordered=False)
+    
+    # Drop items that no longer have ratings
+    db.item_neighbors.delete_many({"updated_at": {"$lt": started}})
+    return len(items)
+
+def similar_items(db, item_id, limit=10):
+    """Precomputed neighbors of an item, most similar first"""
+    doc = db.item_neighbors.find_one({"_id": item_id}, {"neighbors": {"$slice": limit}})
+    return doc['neighbors'] if doc else []
+
+def recommend_for_user(db, user_id, limit=10, history=200):
+    """Score unseen items from the neighbors of the user's recent ratings
+    
+    The prediction for an item is the user's mean plus the similarity-weighted
+    average of the user's centred ratings on its neighbors.
+    """
+    rated = list(db.ratings.find(
+        {"user_id": user_id},
+        {"item_id": 1, "rating": 1, "_id": 0}
+    ).sort(SORT_ORDER).limit(history))
+    if not rated:
+        return []
+    
+    mean = sum(rating['rating'] for rating in rated) / len(rated)
+    centred = {rating['item_id']: rating['rating'] - mean for rating in rated}
+    
+    weighted = {}
+    support = {}
+    for doc in db.item_neighbors.find({"_id": {"$in": list(centred)}}):
+        for neighbor in doc['neighbors']:
+            candidate = neighbor['item_id']
+            if candidate in centred:
+                continue
+            weighted[candidate] = weighted.get(candidate, 0) + neighbor['score'] * centred[doc['_id']]
+            support[candidate] = support.get(candidate, 0) + neighbor['score']
+    
+    predictions = [
+        {
+            "item_id": candidate,
+            "predicted_rating": round(min(5, max(1, mean + weighted[candidate] / support[candidate])), 3),
+            "support": round(support[candidate], 6)
+        }
+        for candidate in weighted
+    ]
+    predictions.sort(key=lambda p: (p['predicted_rating'], p['support']), reverse=True)
+    return predictions[:limit]
\ No newline at end of file
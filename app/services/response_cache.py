@@ -0,0 +1,166 @@
+import hashlib
+import json
+import threading
+from functools import wraps
+from flask import Response, current_app, make_response, request
+from app.services.cache import TTLCache
+from app.services.serialization import MIMETYPES, response_format
+
+# Listing defaults, so equivalent requests share one cache entry
+DEFAULT_ARGS = {"page": "1", "per_page": "10"}
+
+class MemoryBackend:
+    """Per-process response cache"""
+    
+    def __init__(self, maxsize=1000, ttl=60):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        return self._entries.get(key)
+    
+    def set(self, key, value):
+        self._entries.set(key, value)
+    
+    def get_version(self, key):
+        with self._lock:
+            return self._versions.get(key, 0)
+    
+    def bump(self, keys):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+    
+    def stats(self):
+        return self._entries.stats()
+
+class RedisBackend:
+    """Response cache shared between processes through a Redis-compatible server"""
+    
+    def __init__(self, url, ttl=60):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+    
+    def get(self, key):
+        return self._client.get(f"response:{key}")
+    
+    def set(self, key, value):
+        self._client.set(f"response:{key}", value, ex=self.ttl)
+    
+    def get_version(self, key):
+        return int(self._client.get(f"version:{key}") or 0)
+    
+    def bump(self, keys):
+        pipeline = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.incr(f"version:{key}")
+        pipeline.execute()
+    
+    def stats(self):
+        return {"backend": "redis", "ttl": self.ttl}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend(config=None):
+    """Create the configured backend on first use; None when caching is disabled
+    
+    config defaults to the Flask app's; the ASGI routes pass their own.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = current_app.config if config is None else config
+                # memory:// is only coherent with a single process: invalidation
+                # bumps versions locally, so other workers would serve stale pages
+                url = config.get("RESPONSE_CACHE_URL", "none")
+                ttl = config.get("RESPONSE_CACHE_TTL", 60)
+                if url in ("", "none"):
+                    _backend = False
+                elif url.startswith("memory://"):
+                    _backend = MemoryBackend(
+                        maxsize=config.get("RESPONSE_CACHE_SIZE", 1000),
+                        ttl=ttl
+                    )
+                else:
+                    _backend = RedisBackend(url, ttl=ttl)
+    return _backend or None
+
+def _version_key(collection, item_id=None):
+    return f"{collection}:{item_id}" if item_id else f"{collection}:*"
+
+def _cache_key(collection, version, args, response_type):
+    """Hash the normalized query string together with the data version and format"""
+    normalized = dict(DEFAULT_ARGS)
+    normalized.update({key: args.get(key) for key in args})
+    if 'cursor' in args:
+        normalized.pop('page')
+    payload = json.dumps([collection, version, response_type, sorted(normalized.items())])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def listing_key(backend, collection, args, response_type):
+    """Cache key for a listing request at the current data version"""
+    version_key = _version_key(collection, args.get('item_id'))
+    return _cache_key(collection, backend.get_version(version_key), args, response_type)
+
+def split_entry(cached):
+    """Split a cached entry into its ETag and body"""
+    etag, body = cached.split(b' ', 1)
+    return etag.decode(), body
+
+def store_entry(backend, key, body):
+    """Cache a rendered body and return its ETag"""
+    etag = hashlib.sha1(body).hexdigest()
+    backend.set(key, etag.encode() + b' ' + body)
+    return etag
+
+def cached_listing(collection):
+    """Serve a listing view from the response cache with ETag support
+    
+    Listings filtered by item_id are versioned per item, everything else
+    by a collection-wide version; writes bump both via invalidate_listing.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            if backend is None:
+                return view(*args, **kwargs)
+            
+            response_type = response_format()
+            key = listing_key(backend, collection, request.args, response_type)
+            
+            # Cached bodies are replayed as-is, or answered with 304
+            cached = backend.get(key)
+            if cached is not None:
+                etag, body = split_entry(cached)
+                response = Response(body, mimetype=MIMETYPES[response_type])
+                response.vary.add('Accept')
+                response.set_etag(etag)
+                return response.make_conditional(request)
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            
+            response.set_etag(store_entry(backend, key, response.get_data()))
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+def invalidate_listing(collection, item_ids):
+    """Bump listing versions after writes touching the given items"""
+    backend = get_backend()
+    if backend is None:
+        return
+    keys = [_version_key(collection, item_id) for item_id in set(item_ids)]
+    if keys:
+        keys.append(_version_key(collection))
+        backend.bump(keys)
+
+def response_cache_stats():
+    backend = get_backend()
+    return backend.stats() if backend else {"backend": "disabled"}
\ No newline at end of file
@@ -0,0 +1,52 @@
+import os
+
+# Bayesian average prior: an item starts as if it had PRIOR_WEIGHT ratings of PRIOR_MEAN
+PRIOR_MEAN = float(os.getenv("LEADERBOARD_PRIOR_MEAN", 3.0))
+PRIOR_WEIGHT = float(os.getenv("LEADERBOARD_PRIOR_WEIGHT", 10))
+
+# z for the Wilson lower bound (1.96 = 95% confidence)
+WILSON_Z = float(os.getenv("LEADERBOARD_WILSON_Z", 1.96))
+
+SCORE_FIELDS = {
+    "bayes": "bayes_score",
+    "wilson": "wilson_score"
+}
+
+def score_expressions():
+    """Aggregation expressions computing both ranking scores from count and sum
+    
+    The Wilson bound treats the 1-5 mean as a fraction of positive votes,
+    p = (mean - 1) / 4.
+    """
+    z2 = WILSON_Z * WILSON_Z
+    has_ratings = {"$gt": ["$count", 0]}
+    
+    bayes = {"$divide": [
+        {"$add": [PRIOR_WEIGHT * PRIOR_MEAN, "$sum"]},
+        {"$add": [PRIOR_WEIGHT, "$count"]}
+    ]}
+    
+    wilson = {"$let": {
+        "vars": {
+            "n": "$count",
+            "p": {"$divide": [{"$subtract": [{"$divide": ["$sum", "$count"]}, 1]}, 4]}
+        },
+        "in": {"$divide": [
+            {"$subtract": [
+                {"$add": ["$$p", {"$divide": [z2 / 2, "$$n"]}]},
+                {"$multiply": [WILSON_Z, {"$sqrt": {"$divide": [
+                    {"$add": [
+                        {"$multiply": ["$$p", {"$subtract": [1, "$$p"]}]},
+                        {"$divide": [z2 / 4, "$$n"]}
+                    ]},
+                    "$$n"
+                ]}}]}
+            ]},
+            {"$add": [1, {"$divide": [z2, "$$n"]}]}
+        ]}
+    }}
+    
+    return {
+        "bayes_score": {"$cond": [has_ratings, bayes, PRIOR_MEAN]},
+        "wilson_score": {"$cond": [has_ratings, wilson, 0]}
+    }
\ No newline at end of file
@@ -0,0 +1,65 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.services.indexes import text_index_ready
+from app.services.pagination import decode_token, encode_token
+
+MAX_QUERY_LENGTH = 200
+
+class SearchUnavailable(Exception):
+    """Raised when the collection's text index is missing and cannot be built"""
+
+def _decode_search_cursor(cursor):
+    """Parse a search cursor back into its (score, _id) position"""
+    try:
+        payload = decode_token(cursor)
+        return float(payload['s']), ObjectId(payload['id'])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError("Invalid cursor")
+
+def search(collection, text, query, args):
+    """Full-text search over a collection's text index, ranked by relevance
+    
+    Pages are keyed on (score, _id) so a cursor resumes exactly where the
+    previous page ended.
+    """
+    text = (text or '').strip()
+    if not text:
+        raise ValueError("q is required")
+    if len(text) > MAX_QUERY_LENGTH:
+        raise ValueError(f"q must be at most {MAX_QUERY_LENGTH} characters")
+    
+    per_page = int(args.get('per_page', 10))
+    if per_page < 1 or per_page > 100:
+        raise ValueError("per_page must be between 1 and 100")
+    
+    # $text needs the text index; build it on first use if ensure-indexes never ran
+    if not text_index_ready(collection.database, collection.name):
+        raise SearchUnavailable("Search is unavailable: the text index could not be built")
+    
+    pipeline = [
+        {"$match": {"$text": {"$search": text}, **query}},
+        {"$addFields": {"score": {"$meta": "textScore"}}}
+    ]
+    
+    cursor = args.get('cursor')
+    if cursor:
+        score, object_id = _decode_search_cursor(cursor)
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "_id": {"$lt": object_id}}
+        ]}})
+    
+    # Fetch one extra document to know whether another page exists
+    pipeline += [
+        {"$sort": {"score": -1, "_id": -1}},
+        {"$limit": per_page + 1}
+    ]
+    docs = list(collection.aggregate(pipeline))
+    
+    has_more = len(docs) > per_page
+    docs = docs[:per_page]
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_token({"s": docs[-1]['score'], "id": str(docs[-1]['_id'])})
+    
+    return docs, {"per_page": per_page, "next_cursor": next_cursor}
\ No newline at end of file
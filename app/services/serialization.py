@@ -0,0 +1,82 @@
+from datetime import datetime
+import orjson
+from bson import ObjectId, json_util
+from flask import Response, request
+
+MIMETYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack"
+}
+MSGPACK_ALIASES = ("application/msgpack", "application/x-msgpack")
+
+# Dates go through encode_default so they keep the Extended JSON shape
+JSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+EPOCH = datetime(1970, 1, 1)
+
+_msgpack = None
+
+def _load_msgpack():
+    """Import msgpack on first use; None when it is not installed"""
+    global _msgpack
+    if _msgpack is None:
+        try:
+            import msgpack
+            _msgpack = msgpack
+        except ImportError:
+            _msgpack = False
+    return _msgpack or None
+
+def encode_date(value):
+    """Same {"$date": ...} value flask_pymongo's BSONProvider writes, with a fast path for naive UTC"""
+    if value.tzinfo is not None or value < EPOCH:
+        return json_util.default(value, json_util.RELAXED_JSON_OPTIONS)
+    millis = value.microsecond // 1000
+    fraction = f".{millis:03d}" if millis else ""
+    return {"$date": (
+        f"{value.year:04d}-{value.month:02d}-{value.day:02d}T"
+        f"{value.hour:02d}:{value.minute:02d}:{value.second:02d}{fraction}Z"
+    )}
+
+def encode_default(obj):
+    """Encode BSON values the way the API always has: ObjectId as hex, other BSON types as relaxed Extended JSON"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return encode_date(obj)
+    return json_util.default(obj, json_util.RELAXED_JSON_OPTIONS)
+
+def dumps_json(payload):
+    """Serialize a payload of raw MongoDB documents straight to JSON bytes"""
+    return orjson.dumps(payload, default=encode_default, option=JSON_OPTIONS)
+
+def dumps_msgpack(payload):
+    """Serialize a payload of raw MongoDB documents to MessagePack bytes"""
+    return _load_msgpack().packb(payload, default=encode_default)
+
+def response_format(accept_mimetypes=None):
+    """Negotiate the response format from the Accept header
+    
+    MessagePack is only chosen when the client prefers it over JSON and
+    the msgpack package is installed. Pass accept_mimetypes when serving
+    outside a Flask request (the ASGI routes).
+    """
+    accept_mimetypes = request.accept_mimetypes if accept_mimetypes is None else accept_mimetypes
+    best = accept_mimetypes.best_match(
+        (MIMETYPES["json"],) + MSGPACK_ALIASES,
+        default=MIMETYPES["json"]
+    )
+    if best in MSGPACK_ALIASES and _load_msgpack():
+        return "msgpack"
+    return "json"
+
+def encode(payload, response_type):
+    """Serialize a payload in a format chosen by response_format"""
+    return dumps_msgpack(payload) if response_type == "msgpack" else dumps_json(payload)
+
+def render(payload, status=200):
+    """Build a response for documents fetched from MongoDB without patching ids first"""
+    response_type = response_format()
+    response = Response(encode(payload, response_type), status=status, mimetype=MIMETYPES[response_type])
+    response.vary.add("Accept")
+    return response
\ No newline at end of file
@@ -0,0 +1,120 @@
+import os
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+
+GRANULARITIES = ("hour", "day")
+
+# Hourly buckets expire after this many days; daily buckets are kept
+HOURLY_RETENTION_DAYS = int(os.getenv("HOURLY_ROLLUP_RETENTION_DAYS", 30))
+
+def bucket_start(created_at, granularity):
+    """Truncate a timestamp to the start of its hour or day"""
+    if granularity == 'hour':
+        return created_at.replace(minute=0, second=0, microsecond=0)
+    return created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def rollup_id(item_id, granularity, bucket):
+    return f"{item_id}|{granularity}|{bucket:%Y-%m-%dT%H:%M:%S}"
+
+def add_rollup_delta(rollups, item_id, created_at, inc):
+    """Accumulate a rating's count/sum/sum_sq delta into its hourly and daily buckets"""
+    fields = {field: amount for field, amount in inc.items() if field in ("count", "sum", "sum_sq")}
+    for granularity in GRANULARITIES:
+        key = (item_id, granularity, bucket_start(created_at, granularity))
+        target = rollups.setdefault(key, {})
+        for field, amount in fields.items():
+            target[field] = target.get(field, 0) + amount
+    return rollups
+
+def apply_rollup_deltas(db, rollups):
+    """Apply accumulated bucket deltas with one bulk write"""
+    operations = []
+    for (item_id, granularity, bucket), inc in rollups.items():
+        inc = {field: amount for field, amount in inc.items() if amount != 0}
+        if not inc:
+            continue
+        on_insert = {"item_id": item_id, "granularity": granularity, "bucket": bucket}
+        if granularity == 'hour':
+            on_insert["expire_at"] = bucket + timedelta(days=HOURLY_RETENTION_DAYS)
+        operations.append(UpdateOne(
+            {"_id": rollup_id(item_id, granularity, bucket)},
+            {"$inc": inc, "$setOnInsert": on_insert},
+            upsert=True
+        ))
+    
+    if operations:
+        db.rating_rollups.bulk_write(operations, ordered=False)
+
+def item_trend(db, item_id, window, granularity='day'):
+    """Sum an item's buckets over a window instead of scanning raw ratings"""
+    if granularity not in GRANULARITIES:
+        raise ValueError("granularity must be one of: hour, day")
+    
+    since = bucket_start(datetime.utcnow() - window, granularity)
+    buckets = db.rating_rollups.find(
+        {"item_id": item_id, "granularity": granularity, "bucket": {"$gte": since}},
+        {"bucket": 1, "count": 1, "sum": 1}
+    ).sort("bucket", 1)
+    
+    series = []
+    total_count = 0
+    total_sum = 0
+    for doc in buckets:
+        count = doc.get('count', 0)
+        if count <= 0:
+            continue
+        total_count += count
+        total_sum += doc.get('sum', 0)
+        series.append({
+            "bucket": doc['bucket'].isoformat(),
+            "count": count,
+            "mean": doc.get('sum', 0) / count
+        })
+    
+    return {
+        "item_id": item_id,
+        "granularity": granularity,
+        "since": since.isoformat(),
+        "count": total_count,
+        "mean": total_sum / total_count if total_count else None,
+        "series": series
+    }
+
+def backfill_rollups(db):
+    """Rebuild every hourly and daily bucket from the ratings collection"""
+    db.rating_rollups.delete_many({})
+    hourly_since = datetime.utcnow() - timedelta(days=HOURLY_RETENTION_DAYS)
+    
+    for granularity in GRANULARITIES:
+        bucket = {"$dateTrunc": {"date": "$created_at", "unit": granularity}}
+        pipeline = []
+        if granularity == 'hour':
+            pipeline.append({"$match": {"created_at": {"$gte": hourly_since}}})
+        pipeline += [
+            {"$group": {
+                "_id": {"item_id": "$item_id", "bucket": bucket},
+                "count": {"$sum": 1},
+                "sum": {"$sum": "$rating"},
+                "sum_sq": {"$sum": {"$multiply": ["$rating", "$rating"]}}
+            }},
+            {"$project": {
+                "_id": {"$concat": [
+                    "$_id.item_id", f"|{granularity}|",
+                    {"$dateToString": {"date": "$_id.bucket", "format": "%Y-%m-%dT%H:%M:%S"}}
+                ]},
+                "item_id": "$_id.item_id",
+                "granularity": {"$literal": granularity},
+                "bucket": "$_id.bucket",
+                "count": 1,
+                "sum": 1,
+                "sum_sq": 1
+            }}
+        ]
+        if granularity == 'hour':
+            pipeline.append({"$set": {
+                "expire_at": {"$dateAdd": {"startDate": "$bucket", "unit": "day", "amount": HOURLY_RETENTION_DAYS}}
+            }})
+        pipeline.append({"$merge": {"into": "rating_rollups", "on": "_id", "whenMatched": "replace"}})
+        db.ratings.aggregate(pipeline, allowDiskUse=True)
+    
+    return db.rating_rollups.count_documents({})
\ No newline at end of file
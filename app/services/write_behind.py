@@ -0,0 +1,299 @@
+import atexit
+import contextlib
+import logging
+import os
+import queue
+import threading
+import time
+from bson import json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+from app.services.rating_stats import apply_rating_deltas, merge_deltas, rating_delta
+from app.services.response_cache import invalidate_listing
+from app.services.trends import add_rollup_delta
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): safe only with a single process per spill path
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+@contextlib.contextmanager
+def _file_lock(path, blocking=True):
+    """Exclusive advisory lock shared by every process using the same path
+    
+    Yields False when blocking is off and another holder has the lock.
+    """
+    if fcntl is None:
+        yield True
+        return
+    with open(path, "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+class WriteBehindFull(Exception):
+    """Raised when both the queue and the spill file are at capacity"""
+
+class WriteBehindQueue:
+    """Bounded in-process queue whose flusher group-commits inserts
+    
+    Documents must already carry their _id, so a write is acknowledged
+    before it reaches MongoDB and replays are idempotent. When the queue is
+    full or MongoDB is unreachable, documents go to a local NDJSON spill file
+    that is replayed once writes succeed again. Processes may share the
+    spill path: appends and the rename to the replay file hold a file
+    lock, and only one process replays at a time.
+    
+    Spilled entries are marked pending when they may already be inserted
+    without their aggregates applied (a failed or interrupted flush); on
+    replay, pending documents found by _id get their deltas applied.
+    """
+    
+    def __init__(self, app, max_size=10000, flush_interval=0.05, batch_size=500,
+                 spill_path="write_behind_spill.ndjson", spill_max_bytes=100 * 1024 * 1024):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.spill_path = spill_path
+        self.replay_path = spill_path + ".replay"
+        self.offset_path = spill_path + ".offset"
+        self.spill_lock_path = spill_path + ".lock"
+        self.replay_lock_path = self.replay_path + ".lock"
+        self.spill_max_bytes = spill_max_bytes
+        self._queue = queue.Queue(maxsize=max_size)
+        self._spill_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.counters = {"queued": 0, "spilled": 0, "flushed": 0, "replayed": 0, "rejected": 0, "dropped": 0}
+        self._thread = threading.Thread(target=self._run, name="write-behind-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def submit(self, collection, doc):
+        """Queue a validated document for insertion, spilling to disk under backpressure"""
+        if self._stopping.is_set():
+            raise WriteBehindFull("Write queue is shutting down")
+        try:
+            self._queue.put_nowait((collection, doc))
+            self._count("queued")
+        except queue.Full:
+            self._spill([(collection, doc, False)])
+    
+    def close(self, timeout=30):
+        """Stop accepting writes and drain the queue before exit"""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+    
+    def stats(self):
+        with self._counter_lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "depth": self._queue.qsize(),
+            "spill_bytes": self._spill_size()
+        }
+    
+    def _count(self, counter, amount=1):
+        with self._counter_lock:
+            self.counters[counter] += amount
+    
+    def _spill_size(self):
+        try:
+            return os.path.getsize(self.spill_path)
+        except OSError:
+            return 0
+    
+    def _spill(self, entries):
+        with self._spill_lock, _file_lock(self.spill_lock_path):
+            if self._spill_size() >= self.spill_max_bytes:
+                self._count("rejected", len(entries))
+                raise WriteBehindFull("Write queue is full, retry shortly")
+            with open(self.spill_path, "a") as spill:
+                for collection, doc, pending in entries:
+                    entry = {"collection": collection, "doc": doc}
+                    if pending:
+                        entry["pending"] = True
+                    spill.write(json_util.dumps(entry) + "\n")
+            self._count("spilled", len(entries))
+    
+    def _take_batch(self):
+        """Wait for the first document, then gather more until the batch or interval fills"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = []
+            try:
+                batch = [(collection, doc, False) for collection, doc in self._take_batch()]
+                if batch:
+                    self._spill_quietly(self._flush(batch))
+                elif self._spill_size() or os.path.exists(self.replay_path):
+                    self._replay_spill()
+            except Exception:
+                # The flusher must outlive any single failure, or queued writes are lost
+                logger.exception("Write-behind flush failed, spilling %d writes", len(batch))
+                self._spill_quietly([(collection, doc, True) for collection, doc, _ in batch])
+                self._stopping.wait(1.0)
+    
+    def _spill_quietly(self, entries):
+        if not entries:
+            return
+        try:
+            self._spill(entries)
+        except WriteBehindFull:
+            logger.error("Dropped %d queued writes: spill file is full", len(entries))
+    
+    def _flush(self, batch):
+        """Group-commit a batch; returns the entries that must be spilled and retried"""
+        by_collection = {}
+        for entry in batch:
+            by_collection.setdefault(entry[0], []).append(entry)
+        
+        leftover = []
+        with self.app.app_context():
+            db = self.app.mongo.db
+            for collection, entries in by_collection.items():
+                if leftover:
+                    leftover.extend(entries)
+                    continue
+                
+                docs = [doc for _, doc, _ in entries]
+                failed = set()
+                try:
+                    db[collection].insert_many(docs, ordered=False)
+                except BulkWriteError as e:
+                    failed = {error['index'] for error in e.details.get('writeErrors', [])}
+                    # A pending document already present was inserted by an
+                    # earlier attempt that never applied its aggregates
+                    failed -= self._already_present(db, collection, entries, failed)
+                    # Rejected documents (duplicates, replays) are not retried
+                    self._count("dropped", len(failed))
+                except PyMongoError:
+                    # Some documents may be in; replay applies their deltas by _id
+                    logger.exception("Write-behind flush to %s failed, spilling", collection)
+                    leftover.extend((collection, doc, True) for _, doc, _ in entries)
+                    continue
+                
+                inserted = [doc for index, doc in enumerate(docs) if index not in failed]
+                self._count("flushed", len(inserted))
+                try:
+                    self._after_insert(db, collection, inserted)
+                except PyMongoError:
+                    logger.exception("Write-behind aggregates for %s failed, spilling", collection)
+                    leftover.extend((collection, doc, True) for doc in inserted)
+        return leftover
+    
+    def _already_present(self, db, collection, entries, failed):
+        """Indexes of failed pending entries whose _id is already stored"""
+        ids = {entries[index][1]['_id']: index for index in failed if entries[index][2]}
+        if not ids:
+            return set()
+        present = db[collection].find({"_id": {"$in": list(ids)}}, {"_id": 1})
+        return {ids[doc['_id']] for doc in present}
+    
+    def _after_insert(self, db, collection, docs):
+        """Update aggregates and cached listings once per flushed batch"""
+        if not docs:
+            return
+        if collection == 'ratings':
+            deltas = {}
+            rollups = {}
+            for doc in docs:
+                delta = rating_delta(doc['rating'])
+                merge_deltas(deltas.setdefault(doc['item_id'], {}), delta)
+                add_rollup_delta(rollups, doc['item_id'], doc['created_at'], delta)
+            apply_rating_deltas(db, deltas, rollups)
+        try:
+            invalidate_listing(collection, [doc['item_id'] for doc in docs])
+        except Exception:
+            # Cached pages expire on their own; the aggregates are already applied
+            logger.exception("Write-behind cache invalidation for %s failed", collection)
+    
+    def _replay_spill(self):
+        """Move spilled documents back into MongoDB in batches"""
+        with _file_lock(self.replay_lock_path, blocking=False) as locked:
+            if locked:
+                self._replay_locked()
+        
+        # Back off before the next replay attempt
+        self._stopping.wait(1.0)
+    
+    def _replay_locked(self):
+        """Replay the spill file; the caller holds the replay lock"""
+        # A leftover replay file means a previous replay was interrupted
+        with self._spill_lock, _file_lock(self.spill_lock_path):
+            if not os.path.exists(self.replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, self.replay_path)
+        
+        with open(self.replay_path) as replay:
+            entries = [
+                (entry["collection"], entry["doc"], entry.get("pending", False))
+                for entry in (json_util.loads(line) for line in replay if line.strip())
+            ]
+        
+        # Batches flushed before an interruption are not replayed twice
+        for start in range(self._replay_offset(), len(entries), self.batch_size):
+            batch = entries[start:start + self.batch_size]
+            leftover = self._flush(batch)
+            if leftover:
+                # Still unreachable: keep the rest for the next attempt
+                self._spill_quietly(leftover + entries[start + len(batch):])
+                self._count("replayed", len(batch) - len(leftover))
+                break
+            self._count("replayed", len(batch))
+            self._save_replay_offset(start + len(batch))
+        # Offset first: a stale offset must never apply to a newer replay file
+        if os.path.exists(self.offset_path):
+            os.remove(self.offset_path)
+        os.remove(self.replay_path)
+    
+    def _replay_offset(self):
+        try:
+            with open(self.offset_path) as offset:
+                return int(offset.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+    
+    def _save_replay_offset(self, position):
+        with open(self.offset_path + ".tmp", "w") as offset:
+            offset.write(str(position))
+        os.replace(self.offset_path + ".tmp", self.offset_path)
+
+def init_write_behind(app):
+    """Start the write-behind queue when WRITE_BEHIND_ENABLED is set"""
+    app.write_behind = None
+    if app.config.get("WRITE_BEHIND_ENABLED"):
+        app.write_behind = WriteBehindQueue(
+            app,
+            max_size=app.config["WRITE_BEHIND_QUEUE_SIZE"],
+            flush_interval=app.config["WRITE_BEHIND_FLUSH_MS"] / 1000,
+            batch_size=app.config["WRITE_BEHIND_BATCH_SIZE"],
+            spill_path=app.config["WRITE_BEHIND_SPILL_PATH"],
+            spill_max_bytes=app.config["WRITE_BEHIND_SPILL_MAX_BYTES"]
+        )
+    return app.write_behind
\ No newline at end of file
@@ -0,0 +1,58 @@
+from quart import Quart
+from asgiref.wsgi import WsgiToAsgi
+from motor.motor_asyncio import AsyncIOMotorClient
+from werkzeug.exceptions import HTTPException
+from flask_pymongo.helpers import BSONProvider
+
+# Import the WSGI app; it keeps serving every route without an async handler
+from main import application as wsgi_application
+from app.services.metrics import command_listener
+from app.services.rate_limit import load_shedder
+from app.routes.async_routes import async_routes, ASYNC_ENDPOINTS
+
+# Initialize async app
+async_app = Quart(__name__)
+async_app.config["MONGO_URI"] = wsgi_application.config["MONGO_URI"]
+for key in ("RESPONSE_CACHE_URL", "RESPONSE_CACHE_TTL", "RESPONSE_CACHE_SIZE"):
+    async_app.config[key] = wsgi_application.config[key]
+
+# Same JSON encoding as the WSGI app for stats and error bodies
+async_app.json = BSONProvider(async_app)
+async_app.register_blueprint(async_routes)
+
+@async_app.before_serving
+async def connect_mongo():
+    client = AsyncIOMotorClient(
+        async_app.config["MONGO_URI"],
+        connectTimeoutMS=wsgi_application.config["MONGO_CONNECT_TIMEOUT_MS"],
+        event_listeners=[command_listener, load_shedder]
+    )
+    async_app.motor = client.get_default_database()
+
+@async_app.after_serving
+async def close_mongo():
+    async_app.motor.client.close()
+
+@async_app.after_request
+async def add_cors_headers(response):
+    # Mirror the WSGI app's default flask-cors policy
+    response.headers.setdefault("Access-Control-Allow-Origin", "*")
+    return response
+
+wsgi_fallback = WsgiToAsgi(wsgi_application)
+url_adapter = wsgi_application.url_map.bind("")
+
+def _has_async_handler(path, method):
+    """Resolve the request against the WSGI URL map and check for an async handler"""
+    try:
+        endpoint, _ = url_adapter.match(path, method=method)
+    except HTTPException:
+        return False
+    return endpoint in ASYNC_ENDPOINTS
+
+async def application(scope, receive, send):
+    """ASGI entry point: hot read routes on Motor, the rest on the WSGI app"""
+    if scope["type"] == "http" and not _has_async_handler(scope["path"], scope["method"]):
+        await wsgi_fallback(scope, receive, send)
+    else:
+        await async_app(scope, receive, send)
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""Compare requests per second of the WSGI and ASGI entry points
+
+Start both servers against the same database, e.g.
+    
+    gunicorn -w 1 --threads 16 -b 127.0.0.1:8000 main:application
+    hypercorn -w 1 -b 127.0.0.1:8001 asgi:application
+
+then run
+    
+    python -m benchmarks.bench_asgi --wsgi-url http://127.0.0.1:8000 --asgi-url http://127.0.0.1:8001
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATHS = ["/api/ratings?per_page=20", "/api/comments?per_page=20", "/api/users?per_page=20"]
+
+def run_load(base_url, path, concurrency, duration):
+    """Hit one URL from `concurrency` workers for `duration` seconds"""
+    deadline = time.monotonic() + duration
+    lock = threading.Lock()
+    counts = {"ok": 0, "errors": 0}
+    
+    def worker():
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(base_url + path, timeout=10) as response:
+                    response.read()
+                outcome = "ok"
+            except Exception:
+                outcome = "errors"
+            with lock:
+                counts[outcome] += 1
+    
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.monotonic() - started
+    
+    return {
+        "requests": counts["ok"],
+        "errors": counts["errors"],
+        "rps": round(counts["ok"] / elapsed, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wsgi-url", required=True)
+    parser.add_argument("--asgi-url", required=True)
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    
+    report = {"concurrency": args.concurrency, "duration": args.duration, "results": []}
+    for path in args.paths or DEFAULT_PATHS:
+        wsgi = run_load(args.wsgi_url, path, args.concurrency, args.duration)
+        asgi = run_load(args.asgi_url, path, args.concurrency, args.duration)
+        report["results"].append({
+            "path": path,
+            "wsgi": wsgi,
+            "asgi": asgi,
+            "speedup": round(asgi["rps"] / wsgi["rps"], 2) if wsgi["rps"] else None
+        })
+    
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
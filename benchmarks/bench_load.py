@@ -0,0 +1,248 @@
+"""Drive the user, rating and comment endpoints at fixed concurrency
+
+Seeds a local mongod (or an in-memory mongomock stand-in with --in-memory),
+then runs each scenario against the Flask app in-process, or against a
+running server with --base-url, and reports p50/p95/p99 latency and
+throughput as JSON. With --baseline, results are compared with a stored
+report and the run exits non-zero when a scenario regressed.
+    
+    python -m benchmarks.bench_load --output baseline.json
+    python -m benchmarks.bench_load --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from types import SimpleNamespace
+from benchmarks.bench_search import percentile
+from benchmarks.seed import BENCH_PASSWORD, seed_dataset
+
+def next_page(path, body):
+    """Path of the page after this response, or None at the end of the cursor chain"""
+    cursor = json.loads(body).get("next_cursor")
+    if not cursor:
+        return None
+    return f"{path.split('&cursor=')[0]}&cursor={urllib.parse.quote(cursor)}"
+
+def build_scenarios(ids, rng_seed=7):
+    """(name, method, request factory, follow) per endpoint
+    
+    Factories return (path, json body). When follow is set, each worker
+    passes it the previous path and response body and requests the path it
+    returns, going back to the factory when it returns None.
+    """
+    rng = random.Random(rng_seed)
+    lock = threading.Lock()
+    
+    # Cumulative weights are computed once; choices() would redo it per call
+    cum_weights = list(accumulate(ids["item_weights"])) if ids["item_weights"] else None
+    
+    def pick(values, cum_weights=None):
+        with lock:
+            return rng.choices(values, cum_weights=cum_weights)[0] if cum_weights else rng.choice(values)
+    
+    def hot_item():
+        return pick(ids["item_ids"], cum_weights)
+    
+    scenarios = [
+        ("list_users", "GET", lambda: ("/api/users?per_page=20", None)),
+        ("get_user", "GET", lambda: (f"/api/users/{pick(ids['user_ids'])}", None)),
+        ("login", "POST", lambda: ("/api/users/login", {"email": pick(ids["emails"]), "password": BENCH_PASSWORD})),
+        ("list_ratings_by_item", "GET", lambda: (f"/api/ratings?item_id={hot_item()}&per_page=20", None)),
+        ("list_ratings_by_user", "GET", lambda: (f"/api/ratings?user_id={pick(ids['user_ids'])}&per_page=20", None)),
+        ("get_rating", "GET", lambda: (f"/api/ratings/{pick(ids['rating_ids'])}", None)),
+        ("item_stats", "GET", lambda: (f"/api/items/{hot_item()}/stats", None)),
+        ("top_items", "GET", lambda: ("/api/items/top?limit=20", None)),
+        ("list_comments_by_item", "GET", lambda: (f"/api/comments?item_id={hot_item()}&per_page=20", None)),
+        ("get_comment", "GET", lambda: (f"/api/comments/{pick(ids['comment_ids'])}", None)),
+        ("create_comment", "POST", lambda: ("/api/comments", {
+            "user_id": pick(ids["user_ids"]),
+            "item_id": hot_item(),
+            "content": "load test comment"
+        }))
+    ]
+    scenarios = [(name, method, factory, None) for name, method, factory in scenarios]
+    # Walks the whole collection page by page, so later pages are measured too
+    scenarios.insert(5, ("list_ratings_deep_cursor", "GET", lambda: ("/api/ratings?per_page=100&total=none", None), next_page))
+    return scenarios
+
+def http_sender(base_url):
+    """Send requests to a running server; returns (status, body)"""
+    def send(method, path, body):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+    return send
+
+def app_sender(app):
+    """Send requests through the Flask test client, one per thread; returns (status, body)"""
+    local = threading.local()
+    
+    def send(method, path, body):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        response = local.client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+    return send
+
+def run_scenario(send, method, factory, concurrency, duration, follow=None):
+    """Issue requests from `concurrency` workers for `duration` seconds"""
+    deadline = time.monotonic() + duration
+    lock = threading.Lock()
+    samples = []
+    errors = [0]
+    
+    def worker():
+        local_samples = []
+        local_errors = 0
+        next_path = None
+        while time.monotonic() < deadline:
+            path, body = (next_path, None) if next_path else factory()
+            started = time.perf_counter()
+            try:
+                status, response = send(method, path, body)
+            except Exception:
+                status = None
+            local_samples.append((time.perf_counter() - started) * 1000)
+            if status is None or status >= 500:
+                local_errors += 1
+            next_path = follow(path, response) if follow and status == 200 else None
+        with lock:
+            samples.extend(local_samples)
+            errors[0] += local_errors
+    
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.monotonic() - started
+    
+    if not samples:
+        return {"requests": 0, "errors": errors[0], "rps": 0.0}
+    return {
+        "requests": len(samples),
+        "errors": errors[0],
+        "rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 0.50), 2),
+        "p95_ms": round(percentile(samples, 0.95), 2),
+        "p99_ms": round(percentile(samples, 0.99), 2)
+    }
+
+def compare(results, baseline, tolerance):
+    """Scenarios whose p95 grew or throughput fell by more than `tolerance`"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not current.get("requests") or not previous.get("requests"):
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append({"scenario": name, "metric": "p95_ms", "baseline": previous["p95_ms"], "current": current["p95_ms"]})
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append({"scenario": name, "metric": "rps", "baseline": previous["rps"], "current": current["rps"]})
+        if current["errors"] > previous["errors"]:
+            regressions.append({"scenario": name, "metric": "errors", "baseline": previous["errors"], "current": current["errors"]})
+    return regressions
+
+def connect(args):
+    """Database to seed; with --in-memory the app is pointed at the same mongomock client"""
+    if args.in_memory:
+        import mongomock
+        return mongomock.MongoClient().get_database("bench")
+    from pymongo import MongoClient
+    return MongoClient(args.mongo_uri).get_default_database()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/bench")
+    parser.add_argument("--in-memory", action="store_true", help="Use mongomock instead of a mongod (in-process only)")
+    parser.add_argument("--base-url", help="Drive a running server instead of the app in-process")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--ratings", type=int, default=100000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Item popularity exponent")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--scenario", action="append", dest="scenarios", help="Run only these scenarios")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="Compare with a previous report")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    if args.in_memory and args.base_url:
+        parser.error("--in-memory only works in-process")
+    
+    db = connect(args)
+    if args.skip_seed:
+        ids = {
+            "user_ids": [str(doc['_id']) for doc in db.users.find({}, {"_id": 1}).limit(1000)],
+            "emails": [doc['email'] for doc in db.users.find({}, {"email": 1}).limit(1000)],
+            "item_ids": db.rating_stats.distinct("_id")[:args.items],
+            "rating_ids": [str(doc['_id']) for doc in db.ratings.find({}, {"_id": 1}).limit(1000)],
+            "comment_ids": [str(doc['_id']) for doc in db.comments.find({}, {"_id": 1}).limit(1000)]
+        }
+        ids["item_weights"] = None
+    else:
+        ids = seed_dataset(
+            db,
+            users=args.users,
+            items=args.items,
+            ratings=args.ratings,
+            comments=args.comments,
+            zipf=args.zipf,
+            seed=args.seed
+        )
+    
+    if args.base_url:
+        send = http_sender(args.base_url.rstrip('/'))
+    else:
+        os.environ.setdefault("MONGO_URI", args.mongo_uri)
+        os.environ.setdefault("JWT_SECRET_KEY", "bench")
+        # Every in-process request comes from one address
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+        # Repeated listings would be served from the response cache instead of MongoDB
+        os.environ.setdefault("RESPONSE_CACHE_URL", "none")
+        from main import app
+        if args.in_memory:
+            app.mongo = SimpleNamespace(db=db)
+        send = app_sender(app)
+    
+    report = {
+        "config": {key: getattr(args, key) for key in ("users", "items", "ratings", "comments", "zipf", "concurrency", "duration")},
+        "target": args.base_url or ("in-memory" if args.in_memory else args.mongo_uri),
+        "results": {}
+    }
+    for name, method, factory, follow in build_scenarios(ids):
+        if args.scenarios and name not in args.scenarios:
+            continue
+        report["results"][name] = run_scenario(send, method, factory, args.concurrency, args.duration, follow)
+    
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report["results"], json.load(f), args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""Measure per-object cost of the model classes
+
+Times construction, validation, serialization (to_dict) and hydration
+(from_dict) for Rating, Comment and User, and reports object sizes. Run it
+on two checkouts to compare before and after a model change.
+    
+    python -m benchmarks.bench_models --count 100000 > models.json
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from bson import ObjectId
+from app.models.comment import Comment
+from app.models.rating import Rating
+from app.models.user import User
+
+def per_object(action, count):
+    """Best-of-three time per call in microseconds"""
+    rounds = []
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(count):
+            action()
+        rounds.append((time.perf_counter() - started) / count)
+    return round(min(rounds) * 1e6, 3)
+
+def object_size(obj):
+    """Instance size including its __dict__ when the class has one"""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+    
+    user_id = str(ObjectId())
+    rating = Rating(user_id=user_id, item_id="item-1", rating=4, description="Solid")
+    comment = Comment(user_id=user_id, item_id="item-1", content="Works as described")
+    user_doc = {
+        "_id": ObjectId(),
+        "email": "bench@example.com",
+        "password": "scrypt:32768:8:1$salt$hash",
+        "name": "Bench",
+        "created_at": datetime.utcnow()
+    }
+    
+    cases = {
+        "rating": {
+            "construct": lambda: Rating(user_id=user_id, item_id="item-1", rating=4, description="Solid"),
+            "validate": rating.validate,
+            "serialize": rating.to_dict,
+            "hydrate": lambda doc=rating.to_dict(): Rating.from_dict(doc),
+            "size": object_size(rating)
+        },
+        "comment": {
+            "construct": lambda: Comment(user_id=user_id, item_id="item-1", content="Works as described"),
+            "validate": comment.validate,
+            "serialize": comment.to_dict,
+            "hydrate": lambda doc=comment.to_dict(): Comment.from_dict(doc),
+            "size": object_size(comment)
+        },
+        # User construction hashes a password, so only hydration is timed
+        "user": {
+            "hydrate": lambda: User.from_dict(user_doc),
+            "size": object_size(User.from_dict(user_doc))
+        }
+    }
+    
+    report = {"count": args.count, "results": {}}
+    for model, actions in cases.items():
+        # The KDF makes each hydrate slow on older trees, so users are sampled less
+        count = args.count if model != "user" else max(1, args.count // 1000)
+        result = {"bytes": actions.pop("size")}
+        for name, action in actions.items():
+            result[f"{name}_us"] = per_object(action, count)
+        report["results"][model] = result
+    
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Measure comment search latency against a large seeded collection
+
+Seeds synthetic comments with a Zipf-distributed vocabulary, makes sure the
+text index exists, then times search() for a mix of common and rare terms.
+    
+    python -m benchmarks.bench_search --mongo-uri mongodb://localhost:27017/bench --comments 10000000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import MongoClient
+from app.services.indexes import INDEXES
+from app.services.search import search
+
+VOCABULARY_SIZE = 50000
+
+def seed_comments(db, total, batch_size=10000, seed=42):
+    """Insert synthetic comments until the collection holds `total` documents"""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(VOCABULARY_SIZE)]
+    weights = [1 / (rank + 1) for rank in range(VOCABULARY_SIZE)]
+    users = [ObjectId() for _ in range(10000)]
+    start = datetime.utcnow() - timedelta(days=365)
+    
+    existing = db.comments.estimated_document_count()
+    while existing < total:
+        size = min(batch_size, total - existing)
+        batch = []
+        for _ in range(size):
+            batch.append({
+                "user_id": rng.choice(users),
+                "item_id": f"item-{int(rng.paretovariate(1.2)) % 100000}",
+                "content": " ".join(rng.choices(words, weights=weights, k=rng.randint(5, 40))),
+                "created_at": start + timedelta(seconds=rng.randint(0, 365 * 86400))
+            })
+        db.comments.insert_many(batch, ordered=False)
+        existing += size
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/bench")
+    parser.add_argument("--comments", type=int, default=10000000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--per-page", type=int, default=20)
+    args = parser.parse_args()
+    
+    db = MongoClient(args.mongo_uri).get_default_database()
+    seed_comments(db, args.comments)
+    db.comments.create_indexes(INDEXES["comments"])
+    
+    # Common, mid-frequency and rare terms exercise very different posting list sizes
+    rng = random.Random(7)
+    terms = {
+        "common": ["w0", "w1", "w2"],
+        "medium": [f"w{i}" for i in range(100, 110)],
+        "rare": [f"w{i}" for i in range(40000, 40010)]
+    }
+    report = {"comments": db.comments.estimated_document_count(), "results": {}}
+    for label, candidates in terms.items():
+        samples = []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            search(db.comments, rng.choice(candidates), {}, {"per_page": args.per_page})
+            samples.append((time.perf_counter() - started) * 1000)
+        report["results"][label] = {
+            "p50_ms": round(percentile(samples, 0.50), 2),
+            "p95_ms": round(percentile(samples, 0.95), 2),
+            "p99_ms": round(percentile(samples, 0.99), 2)
+        }
+    
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
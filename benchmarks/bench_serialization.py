@@ -0,0 +1,91 @@
+"""Compare the listing serialization paths at several page sizes
+
+Builds synthetic rating documents as PyMongo returns them and times the
+previous path (patch ObjectIds to strings, then jsonify) against the
+orjson encoder and MessagePack. No database is needed.
+    
+    python -m benchmarks.bench_serialization --repeat 200
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from flask import Flask, jsonify
+from flask_pymongo.helpers import BSONProvider
+from app.services.serialization import dumps_json, dumps_msgpack, _load_msgpack
+
+PAGE_SIZES = (10, 100, 1000)
+
+def make_ratings(count, seed=42):
+    """Rating documents with the same field types as the ratings collection"""
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(days=30)
+    return [{
+        "_id": ObjectId(),
+        "user_id": ObjectId(),
+        "item_id": f"item-{rng.randint(1, 5000)}",
+        "rating": rng.randint(1, 5),
+        "description": "lorem ipsum " * rng.randint(1, 10),
+        "created_at": start + timedelta(seconds=rng.randint(0, 30 * 86400))
+    } for _ in range(count)]
+
+def legacy_path(docs):
+    """The per-document string patching and jsonify used before"""
+    docs = [dict(doc) for doc in docs]
+    for doc in docs:
+        doc['_id'] = str(doc['_id'])
+        doc['user_id'] = str(doc['user_id'])
+    return jsonify({"ratings": docs, "per_page": len(docs)}).get_data()
+
+def orjson_path(docs):
+    return dumps_json({"ratings": docs, "per_page": len(docs)})
+
+def msgpack_path(docs):
+    return dumps_msgpack({"ratings": docs, "per_page": len(docs)})
+
+def time_path(path, docs, repeat):
+    """Best-of-three mean time per call in microseconds"""
+    path(docs)
+    rounds = []
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            path(docs)
+        rounds.append((time.perf_counter() - started) / repeat)
+    return round(min(rounds) * 1e6, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    
+    paths = {"jsonify": legacy_path, "orjson": orjson_path}
+    if _load_msgpack():
+        paths["msgpack"] = msgpack_path
+    
+    # The app's jsonify goes through flask_pymongo's provider
+    app = Flask(__name__)
+    app.json = BSONProvider(app)
+    report = {"repeat": args.repeat, "results": []}
+    with app.app_context():
+        for per_page in PAGE_SIZES:
+            docs = make_ratings(per_page)
+            # Large pages are repeated less so every size finishes quickly
+            repeat = max(1, args.repeat * 10 // per_page)
+            timings = {name: time_path(path, docs, repeat) for name, path in paths.items()}
+            report["results"].append({
+                "per_page": per_page,
+                "microseconds": timings,
+                "bytes": {name: len(path(docs)) for name, path in paths.items()},
+                "speedup": {
+                    name: round(timings["jsonify"] / value, 2)
+                    for name, value in timings.items() if name != "jsonify"
+                }
+            })
+    
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
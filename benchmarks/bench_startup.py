@@ -0,0 +1,106 @@
+"""Profile cold start: import time per module and time to first response
+
+Each run starts a fresh interpreter, like a serverless cold start. Import
+times come from `python -X importtime`; time to first response covers
+importing main plus serving one request through the WSGI app.
+    
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+FIRST_RESPONSE_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+response = main.app.test_client().get(sys.argv[1])
+finished = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (finished - started) * 1000,
+    "status": response.status_code,
+    "mongo_connected": getattr(main.app.mongo, "connected", None)
+}))
+"""
+
+def startup_env():
+    """Inherit the environment, filling in what main needs to import"""
+    env = dict(os.environ)
+    env.setdefault("MONGO_URI", "mongodb://localhost:27017/startup")
+    env.setdefault("JWT_SECRET_KEY", "startup")
+    return env
+
+def import_times(top):
+    """Self and cumulative import time per module for `import main`, slowest first"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=startup_env(), capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": round(int(self_us) / 1000, 2),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 2)
+        })
+    
+    total = next((module["cumulative_ms"] for module in modules if module["module"] == "main"), None)
+    # Direct imports of main show where its time goes; self time finds individual slow modules
+    direct = [module for module in modules if module["depth"] == 1]
+    return {
+        "total_ms": total,
+        "main_imports": sorted(direct, key=lambda module: -module["cumulative_ms"])[:top],
+        "slowest_modules": sorted(modules, key=lambda module: -module["self_ms"])[:top]
+    }
+
+def first_response(path):
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_RESPONSE_SCRIPT, path],
+        env=startup_env(), capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/", help="Request served for time to first response")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, help="Exit non-zero when median time to first response exceeds this")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+    
+    runs = [first_response(args.path) for _ in range(args.runs)]
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(run["import_ms"] for run in runs), 1),
+        "first_response_ms_median": round(statistics.median(run["first_response_ms"] for run in runs), 1),
+        "first_response_status": runs[-1]["status"],
+        "mongo_connected_at_first_response": runs[-1]["mongo_connected"],
+        "imports": import_times(args.top)
+    }
+    
+    exit_code = 0
+    if args.budget_ms is not None:
+        report["budget_ms"] = args.budget_ms
+        report["over_budget"] = report["first_response_ms_median"] > args.budget_ms
+        exit_code = 1 if report["over_budget"] else 0
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""Seed a database with synthetic users, ratings and comments
+
+Item popularity follows a Zipf distribution so a few hot items receive most
+ratings and comments, like production traffic. Seeding is deterministic for
+a given seed.
+"""
+import random
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from werkzeug.security import generate_password_hash
+from app.services.indexes import ensure_indexes
+from app.services.rating_stats import rebuild_rating_stats
+
+BENCH_PASSWORD = "bench-password"
+
+def zipf_weights(count, exponent):
+    """Relative popularity of items ranked 1..count"""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+def _insert(collection, docs, batch_size):
+    for start in range(0, len(docs), batch_size):
+        collection.insert_many(docs[start:start + batch_size], ordered=False)
+
+def seed_dataset(db, users=1000, items=5000, ratings=100000, comments=20000, zipf=1.1, seed=42, batch_size=10000):
+    """Replace the benchmark collections with a synthetic dataset
+    
+    Returns the ids the load generator picks from.
+    """
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(days=90)
+    
+    def timestamp():
+        return start + timedelta(seconds=rng.randint(0, 90 * 86400))
+    
+    for name in ("users", "ratings", "comments", "rating_stats", "rating_rollups"):
+        db[name].drop()
+    ensure_indexes(db)
+    
+    # One hash shared by every user keeps seeding fast and login benchmarkable
+    password = generate_password_hash(BENCH_PASSWORD)
+    user_docs = [{
+        "_id": ObjectId(),
+        "email": f"bench{i}@example.com",
+        "password": password,
+        "name": f"Bench User {i}",
+        "created_at": timestamp()
+    } for i in range(users)]
+    _insert(db.users, user_docs, batch_size)
+    user_ids = [doc['_id'] for doc in user_docs]
+    
+    item_ids = [f"item-{i}" for i in range(items)]
+    weights = zipf_weights(items, zipf)
+    
+    # One rating per (user, item), so skewed draws are retried
+    pairs = set()
+    limit = min(ratings, users * items)
+    while len(pairs) < limit:
+        for item_id in rng.choices(item_ids, weights=weights, k=limit - len(pairs)):
+            pairs.add((rng.choice(user_ids), item_id))
+    rating_docs = [{
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "item_id": item_id,
+        "rating": rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 2, 4, 4))[0],
+        "description": "benchmark rating",
+        "created_at": timestamp()
+    } for user_id, item_id in pairs]
+    _insert(db.ratings, rating_docs, batch_size)
+    
+    comment_docs = [{
+        "_id": ObjectId(),
+        "user_id": rng.choice(user_ids),
+        "item_id": item_id,
+        "content": "benchmark comment " * rng.randint(1, 10),
+        "created_at": timestamp()
+    } for item_id in rng.choices(item_ids, weights=weights, k=comments)]
+    _insert(db.comments, comment_docs, batch_size)
+    
+    try:
+        rebuild_rating_stats(db)
+    except OperationFailure:
+        # The in-memory stand-in lacks some aggregation operators; stats-backed
+        # endpoints then serve empty aggregates
+        pass
+    
+    return {
+        "user_ids": [str(user_id) for user_id in user_ids],
+        "emails": [doc['email'] for doc in user_docs],
+        "item_ids": item_ids,
+        "item_weights": weights,
+        "rating_ids": [str(doc['_id']) for doc in rating_docs[:1000]],
+        "comment_ids": [str(doc['_id']) for doc in comment_docs[:1000]]
+    }
\ No newline at end of file
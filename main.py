@@ -1,9 +1,7 @@
-from flask import Flask
-from flask_pymongo import PyMongo
+from flask import Flask, Response
 from dotenv import load_dotenv
 from flask_cors import CORS
 import os
-import jwt
 
 # Load environment variables
 load_dotenv()
@@ -15,12 +13,68 @@ app = Flask(__name__)
 app.config["MONGO_URI"] = os.getenv("MONGO_URI")
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
 app.config["MONGO_CONNECT_TIMEOUT_MS"] = 5000
+app.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"] = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+# Serverless instances handle one request at a time, so a small pool avoids
+# exhausting Atlas connection limits across many concurrent instances
+app.config["MONGO_MAX_POOL_SIZE"] = int(os.getenv("MONGO_MAX_POOL_SIZE", 10 if os.getenv("VERCEL") else 100))
+app.config["MONGO_MIN_POOL_SIZE"] = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+app.config["MONGO_MAX_IDLE_TIME_MS"] = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+app.config["ENSURE_INDEXES_ON_STARTUP"] = os.getenv("ENSURE_INDEXES_ON_STARTUP", "false").lower() == "true"
+app.config["RESPONSE_CACHE_URL"] = os.getenv("RESPONSE_CACHE_URL", "none")
+app.config["RESPONSE_CACHE_TTL"] = int(os.getenv("RESPONSE_CACHE_TTL", 60))
+app.config["RESPONSE_CACHE_SIZE"] = int(os.getenv("RESPONSE_CACHE_SIZE", 1000))
+app.config["PASSWORD_HASH_METHOD"] = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+app.config["PASSWORD_HASH_WORKERS"] = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+app.config["PASSWORD_HASH_QUEUE_LIMIT"] = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 16))
+app.config["WRITE_BEHIND_ENABLED"] = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+app.config["WRITE_BEHIND_QUEUE_SIZE"] = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", 10000))
+app.config["WRITE_BEHIND_FLUSH_MS"] = int(os.getenv("WRITE_BEHIND_FLUSH_MS", 50))
+app.config["WRITE_BEHIND_BATCH_SIZE"] = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 500))
+app.config["WRITE_BEHIND_SPILL_PATH"] = os.getenv("WRITE_BEHIND_SPILL_PATH", "write_behind_spill.ndjson")
+app.config["WRITE_BEHIND_SPILL_MAX_BYTES"] = int(os.getenv("WRITE_BEHIND_SPILL_MAX_BYTES", 100 * 1024 * 1024))
+app.config["DELETION_JOBS_WORKER"] = os.getenv("DELETION_JOBS_WORKER", "false" if os.getenv("VERCEL") else "true").lower() == "true"
+app.config["DELETION_JOBS_BATCH_SIZE"] = int(os.getenv("DELETION_JOBS_BATCH_SIZE", 500))
+app.config["SLOW_QUERY_MS"] = int(os.getenv("SLOW_QUERY_MS", 100))
+app.config["RATE_LIMIT_ENABLED"] = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+app.config["RATE_LIMIT_URL"] = os.getenv("RATE_LIMIT_URL", "memory://")
+app.config["RATE_LIMIT_DEFAULT_BURST"] = int(os.getenv("RATE_LIMIT_DEFAULT_BURST", 120))
+app.config["RATE_LIMIT_DEFAULT_RATE"] = float(os.getenv("RATE_LIMIT_DEFAULT_RATE", 20))
+app.config["RATE_LIMIT_API_KEYS"] = os.getenv("RATE_LIMIT_API_KEYS", "")
+app.config["RATE_LIMIT_TRUST_FORWARDED"] = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+app.config["SHED_MAX_IN_FLIGHT"] = int(os.getenv("SHED_MAX_IN_FLIGHT", 100))
+app.config["SHED_DB_LATENCY_MS"] = int(os.getenv("SHED_DB_LATENCY_MS", 1000))
+app.config["EVENTS_MODE"] = os.getenv("EVENTS_MODE", "auto").lower()
+app.config["EVENTS_BUFFER_SIZE"] = int(os.getenv("EVENTS_BUFFER_SIZE", 100))
+app.config["EVENTS_HISTORY_SIZE"] = int(os.getenv("EVENTS_HISTORY_SIZE", 1000))
+app.config["EVENTS_MAX_SUBSCRIBERS"] = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", 1000))
+app.config["EVENTS_POLL_INTERVAL"] = float(os.getenv("EVENTS_POLL_INTERVAL", 2))
+app.config["EVENTS_HEARTBEAT"] = float(os.getenv("EVENTS_HEARTBEAT", 15))
+app.config["RECOMMENDATIONS_TOP_N"] = int(os.getenv("RECOMMENDATIONS_TOP_N", 20))
+app.config["EVENTS_PRE_IMAGES"] = os.getenv("EVENTS_PRE_IMAGES", "false").lower() == "true"
 
 # Configure CORS
 CORS(app)
 
-# Configure MongoDB
-mongo = PyMongo(app)
+# Configure request and MongoDB command instrumentation
+from app.services.metrics import command_listener, init_metrics, render_metrics
+command_listener.slow_query_ms = app.config["SLOW_QUERY_MS"]
+init_metrics(app)
+
+# Shed load and rate limit callers before any handler runs
+from app.services.rate_limit import init_rate_limiting, load_shedder, rate_limit_stats
+init_rate_limiting(app)
+
+# Configure MongoDB; the client is created on first use and reused across warm invocations
+from app.services.mongo import LazyMongo
+mongo = LazyMongo(
+    app,
+    event_listeners=[command_listener, load_shedder],
+    connectTimeoutMS=app.config["MONGO_CONNECT_TIMEOUT_MS"],
+    serverSelectionTimeoutMS=app.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"],
+    maxPoolSize=app.config["MONGO_MAX_POOL_SIZE"],
+    minPoolSize=app.config["MONGO_MIN_POOL_SIZE"],
+    maxIdleTimeMS=app.config["MONGO_MAX_IDLE_TIME_MS"]
+)
 app.mongo = mongo
 
 # Import and register blueprints
@@ -32,9 +86,68 @@ app.register_blueprint(user_routes)
 app.register_blueprint(rating_routes)
 app.register_blueprint(comment_routes)
 
+from app.services.indexes import ensure_indexes
+from app.commands import register_commands
+from app.services.cache import cache_stats
+from app.services.response_cache import response_cache_stats
+from app.services.passwords import hash_stats
+from app.services.write_behind import init_write_behind
+from app.services.deletion_jobs import init_deletion_jobs
+from app.services.events import init_change_feed
+
+# Apply declared indexes
+if app.config["ENSURE_INDEXES_ON_STARTUP"]:
+    ensure_indexes(mongo.db)
+
+# Start the write-behind flusher when enabled
+init_write_behind(app)
+
+# Start the background worker for user deletion jobs
+init_deletion_jobs(app)
+
+# Live item event feed; its change stream starts with the first subscriber
+init_change_feed(app)
+
+# Register CLI commands
+register_commands(app)
+
 @app.route('/')
 def home():
    return {"message": "API is running"}
 
+@app.route('/api/cache/stats')
+def get_cache_stats():
+   return {**cache_stats(), "responses": response_cache_stats()}
+
+@app.route('/api/hashing/stats')
+def get_hashing_stats():
+   return hash_stats()
+
+@app.route('/api/write-behind/stats')
+def get_write_behind_stats():
+   if not app.write_behind:
+       return {"enabled": False}
+   return {"enabled": True, **app.write_behind.stats()}
+
+@app.route('/api/rate-limit/stats')
+def get_rate_limit_stats():
+   return rate_limit_stats()
+
+@app.route('/api/events/stats')
+def get_events_stats():
+   return app.change_feed.stats()
+
+@app.route('/metrics')
+def get_metrics():
+   return Response(
+       render_metrics(
+           cache=cache_stats(),
+           hashing=hash_stats(),
+           write_behind=app.write_behind.stats() if app.write_behind else None,
+           rate_limit=rate_limit_stats()
+       ),
+       mimetype="text/plain; version=0.0.4"
+   )
+
 # Export for vercel
 application = app
\ No newline at end of file